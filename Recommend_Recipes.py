@@ -1,6 +1,7 @@
 import streamlit as st
 import ast
 from src.loaders import ModelLoader
+from src.eda_summary import MEAT
 
 ModelLoader.ensure_models_loaded()
 recommender = st.session_state.recommender
@@ -13,6 +14,29 @@ user_input = st.text_input(
     placeholder="e.g. chicken, rice, tomato, garlic"
 )
 
+def split_ingredients(text):
+    return [ing.strip().lower() for ing in text.split(",") if ing.strip()]
+
+if user_input.strip():
+    # Terms the index knows for the last entry, and spelling hints for words it has never seen
+    autocomplete = recommender.autocomplete
+    completions = autocomplete.suggest(user_input.split(",")[-1], limit=6)
+    if completions:
+        st.caption("Matching ingredients: " + ", ".join(completions))
+    entries = split_ingredients(user_input)
+    # A last entry with completions is taken as still being typed
+    for ingredient in entries[:-1] if completions else entries:
+        unknown = autocomplete.unknown_words(ingredient)
+        if unknown:
+            hints = [term for word in unknown for term, _, _ in autocomplete.correct(word, limit=1)]
+            st.caption(f"'{ingredient}' is not in the recipe index" + (f" — did you mean {', '.join(hints)}?" if hints else "."))
+
+    # Read off the precomputed co-occurrence rows, so it is cheap to show on every rerun
+    pantry = [token for item in recommender.canonical_ingredients(split_ingredients(user_input)) for token in item.split()]
+    pairings = recommender.ingredient_stats.suggest(pantry, top_n=5)
+    if pairings:
+        st.caption("Often cooked with: " + ", ".join(term for term, _ in pairings))
+
 col1, col2 = st.columns(2)
 with col1:
     max_calories = st.slider(
@@ -31,23 +55,45 @@ with col2:
         value=5
     )
 
+col3, col4 = st.columns(2)
+with col3:
+    must_include = st.text_input("Must include (comma-separated):", placeholder="e.g. chicken")
+with col4:
+    must_exclude = st.text_input("Exclude (comma-separated):", placeholder="e.g. nuts, mushroom")
+
+# Only the hybrid scorer (SCORER=hybrid) ranks by closeness to a calorie target
+blended = recommender.scorer.uses_pantry
+target_calories = 0
+col5, col6 = st.columns(2)
+if blended:
+    with col5:
+        target_calories = st.number_input(
+            "Target calories per serving (0 for none)",
+            min_value=0,
+            max_value=4000,
+            value=0,
+            step=50
+        )
+with col6 if blended else col5:
+    vegetarian = st.checkbox("Vegetarian only")
+
 if st.button("Find Recipes"):
 
     if not user_input.strip():
         st.warning("Please enter at least one ingredient.")
         st.stop()
 
-    ingredients = [
-        ing.strip().lower()
-        for ing in user_input.split(",")
-        if ing.strip()
-    ]
+    ingredients = split_ingredients(user_input)
+    exclude = split_ingredients(must_exclude) + (MEAT if vegetarian else [])
 
     with st.spinner("Searching for matching recipes..."):
         results = recommender.recommend_by_ingredients(
             input_ingredients=ingredients,
             top_k=top_k,
-            max_calories=max_calories
+            max_calories=max_calories,
+            include=split_ingredients(must_include),
+            exclude=exclude,
+            target_calories=target_calories or None
         )
 
     # ---------- RESULTS ----------
@@ -60,6 +106,7 @@ if st.button("Find Recipes"):
             with st.expander(
                 f"{row['title']} • {row['calories']} cal • "
                 f"Similarity: {row['similarity']:.2f}"
+                + (f" • Score: {row['score']:.2f}" if blended else "")
             ):
                 if row.get("image"):
                     st.image(row["image"], width=250)
@@ -0,0 +1,65 @@
+"""
+Recall@k and latency of the approximate (impact index) backend against exact scoring.
+
+For each corpus size the impact index is built once, then every depth is measured on the
+same queries. Recall@k is the share of the exact top-k recipes the approximate path returns;
+"scored" is the share of the catalog scored per query. Run from the repository root:
+
+    python -m benchmarks.ann_recall --sizes 10000 100000 --depth 25 50 100 200 1000
+"""
+import argparse
+import time
+import numpy as np
+
+from benchmarks.synthetic import make_corpus, make_queries, fit_vectorizer
+from benchmarks.recommend_latency import measure
+from src.ann_index import ImpactIndex
+from src.recommender import RecipeRecommender
+from src.utils.query_cache import QueryCache
+
+
+def top_k_ids(recommender, queries, top_k):
+    return [set(recommender.recommend_by_ingredients(query, top_k=top_k).index) for query in queries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--depth", type=int, nargs="+", default=[25, 50, 100, 200, 1000])
+    parser.add_argument("--max-depth", type=int, default=4096)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    print(f"{'recipes':>10} {'depth':>7} {'recall@k':>9} {'scored':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        df = make_corpus(size)
+        vectorizer, tfidf_matrix = fit_vectorizer(df)
+
+        start = time.perf_counter()
+        ann_index = ImpactIndex.build(tfidf_matrix, args.max_depth)
+        print(f"Impact index for {size} recipes: {time.perf_counter() - start:.1f}s, {ann_index.nbytes() / 2**20:.1f} MiB")
+
+        recommender = RecipeRecommender.from_artifacts(vectorizer, tfidf_matrix, df, ann_index=ann_index)
+        # Queries are repeated across settings, so results must not come from the cache
+        recommender.query_cache = QueryCache(max_size=0)
+        exact = top_k_ids(recommender, queries, args.top_k)
+        fn = lambda q: recommender.recommend_by_ingredients(q, top_k=args.top_k)
+        p50, p99 = measure(fn, queries)
+        print(f"{size:>10} {'exact':>7} {1.0:>9.3f} {1.0:>8.2%} {p50:>8.3f} {p99:>8.3f}")
+
+        for depth in args.depth:
+            recommender.set_backend("ann", depth)
+            approximate = top_k_ids(recommender, queries, args.top_k)
+            recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact) if e])
+            scored = np.mean([
+                len(ann_index.candidates(vectorizer.transform([" ".join(q)]), depth)) / size for q in queries
+            ])
+            p50, p99 = measure(fn, queries)
+            print(f"{size:>10} {depth:>7} {recall:>9.3f} {scored:>8.2%} {p50:>8.3f} {p99:>8.3f}")
+        recommender.set_backend("exact")
+
+
+if __name__ == "__main__":
+    main()
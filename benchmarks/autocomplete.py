@@ -0,0 +1,97 @@
+"""
+Latency of IngredientAutocomplete.suggest for typed prefixes and misspelled words.
+
+Uses the serving index (INDEX_DIR) by default, or a synthetic corpus with --size. Prefix
+queries are vocabulary terms cut at a random length, typo queries are single-word terms
+with one random deletion, substitution or swap. The baseline scans the whole vocabulary
+with str.startswith and sorts the matches by document frequency. Run from the repository root:
+
+    python -m benchmarks.autocomplete --queries 2000
+    python -m benchmarks.autocomplete --size 100000
+"""
+import argparse
+import string
+import time
+import numpy as np
+
+from src.autocomplete import IngredientAutocomplete
+from src.utils.preprocess import Preprocessor
+
+
+def load_autocomplete(size):
+    if size:
+        from benchmarks.synthetic import make_corpus, fit_vectorizer
+        vectorizer, tfidf_matrix = fit_vectorizer(make_corpus(size))
+        return IngredientAutocomplete.from_vectorizer(vectorizer, tfidf_matrix)
+    from src.recommender import RecipeRecommender
+    return RecipeRecommender().autocomplete
+
+
+def make_prefixes(terms, n_queries, rng):
+    picks = rng.choice(len(terms), size=n_queries)
+    return [terms[i][:rng.integers(1, len(terms[i]) + 1)] for i in picks]
+
+
+def make_typos(terms, n_queries, rng):
+    words = [term for term in terms if " " not in term and len(term) >= 5]
+    typos = []
+    for i in rng.choice(len(words), size=n_queries):
+        word, position = words[i], int(rng.integers(0, len(words[i]) - 1))
+        edit = rng.integers(3)
+        if edit == 0:
+            typos.append(word[:position] + word[position + 1:])
+        elif edit == 1:
+            typos.append(word[:position] + rng.choice(list(string.ascii_lowercase)) + word[position + 1:])
+        else:
+            typos.append(word[:position] + word[position + 1] + word[position] + word[position + 2:])
+    return typos
+
+
+def scan_suggest(terms, doc_freq, text, limit=8):
+    # Baseline: linear scan of the decoded vocabulary
+    prefix = IngredientAutocomplete.normalize(text)
+    matches = [(term, freq) for term, freq in zip(terms, doc_freq) if prefix and term.startswith(prefix)]
+    return [term for term, _ in sorted(matches, key=lambda match: -match[1])[:limit]]
+
+
+def latencies_ms(fn, queries):
+    for query in queries[:50]:
+        fn(query)
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, [50, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=0, help="synthetic corpus size; 0 uses INDEX_DIR")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    autocomplete = load_autocomplete(args.size)
+    terms = [autocomplete.term(i) for i in range(len(autocomplete.terms))]
+    rng = np.random.default_rng(0)
+    prefixes = make_prefixes(terms, args.queries, rng)
+    typos = make_typos(terms, args.queries, rng)
+
+    Preprocessor.clean_text("warm up")
+    start = time.perf_counter()
+    autocomplete.correct("warmup")
+    build_ms = (time.perf_counter() - start) * 1000
+    corrected = sum(bool(autocomplete.suggest(typo, args.limit)) for typo in typos) / len(typos)
+
+    print(f"{len(terms)} terms, delete index built in {build_ms:.1f} ms, {corrected:.1%} of typos get a suggestion")
+    print(f"{'queries':>8} {'method':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, queries in (("prefix", prefixes), ("typo", typos)):
+        p50, p99 = latencies_ms(lambda q: autocomplete.suggest(q, args.limit), queries)
+        print(f"{name:>8} {'index':>12} {p50:>9.4f} {p99:>9.4f}")
+    p50, p99 = latencies_ms(lambda q: scan_suggest(terms, autocomplete.doc_freq, q, args.limit), prefixes)
+    print(f"{'prefix':>8} {'linear scan':>12} {p50:>9.4f} {p99:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Size, accuracy and latency of the random-forest calorie models against the compact linear model.
+
+The compact model is fitted on the same train split and features the forest regressor was
+trained on (OUTPUT_PATH, test_size=0.2, random_state=42). Regression MAE is reported on that
+test split. The forest classifier was trained on a stratified split instead, so classifier
+accuracy is reported on the recipes held out by both splits.
+Latency is predict() for one ingredient list and predict_batch() per list. Run from the
+repository root:
+
+    python -m benchmarks.calorie_serving --batch-size 256 --save
+"""
+import argparse
+import os
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.model_selection import train_test_split
+
+from src.calorie_predictor import (
+    CaloriePredictor, COMPACT_MODEL_FILE, MODEL_DIR, classify_calories, fit_compact_model
+)
+
+
+def pickled_nbytes(predictor):
+    return len(pickle.dumps(predictor.regressor)) + len(pickle.dumps(predictor.classifier))
+
+
+def latencies(fn, inputs):
+    times = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--save", action="store_true", help=f"write {COMPACT_MODEL_FILE} to {MODEL_DIR}")
+    args = parser.parse_args()
+
+    load_dotenv()
+    df = pd.read_csv(os.getenv("OUTPUT_PATH", "data/processed/recipes_clean.csv"))
+    documents = df["ingredients_cleaned"].fillna("")
+    forest = CaloriePredictor.load()
+    X = forest.vectorizer.transform(documents)
+    y = np.log1p(df["calories"]) if forest.was_log_transformed else df["calories"]
+
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    start = time.perf_counter()
+    compact = fit_compact_model(forest.vectorizer, X_train, y_train, forest.was_log_transformed)
+    print(f"Compact model fitted in {time.perf_counter() - start:.1f}s")
+
+    classes = classify_calories(df["calories"])
+    _, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    _, test_c = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42, stratify=classes)
+    test_c = np.intersect1d(test_c, test_rows)
+    print(f"{len(test_rows)} test recipes, {len(test_c)} held out from both classifiers")
+    true_calories = df["calories"].to_numpy()
+    queries = [doc.split() for doc in documents.iloc[test_rows[:args.queries]]]
+    batches = [queries[i:i + args.batch_size] for i in range(0, len(queries), args.batch_size)]
+
+    print(f"{'model':>8} {'KiB':>9} {'MAE':>8} {'class acc':>10} {'p50 ms':>8} {'p99 ms':>8} {'batch ms/item':>14}")
+    for name, predictor in (("forest", forest), ("compact", compact)):
+        calories, _ = predictor.predict_documents(documents.iloc[test_rows])
+        mae = np.mean(np.abs(calories - true_calories[test_rows]))
+        _, predicted_classes = predictor.predict_documents(documents.iloc[test_c])
+        accuracy = np.mean(predicted_classes == classes[test_c])
+
+        p50, p99 = latencies(predictor.predict, queries)
+        start = time.perf_counter()
+        for batch in batches:
+            predictor.predict_batch(batch)
+        per_item = (time.perf_counter() - start) * 1000 / len(queries)
+        kib = pickled_nbytes(predictor) / 1024
+        print(f"{name:>8} {kib:>9.0f} {mae:>8.1f} {accuracy:>10.3f} {p50:>8.3f} {p99:>8.3f} {per_item:>14.3f}")
+
+    if args.save:
+        compact.save(os.path.join(MODEL_DIR, COMPACT_MODEL_FILE))
+        print(f"Saved {os.path.join(MODEL_DIR, COMPACT_MODEL_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
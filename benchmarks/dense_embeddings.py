@@ -0,0 +1,71 @@
+"""
+Memory footprint, ranking agreement and latency of the dense embedding backend.
+
+For each corpus size the sparse TF-IDF path is the reference. Every (components, dtype)
+setting reports the size of the scored matrix, top-k agreement with the sparse ranking
+(share of the sparse top-k it returns), and recommend_by_ingredients latency. Run from the
+repository root:
+
+    python -m benchmarks.dense_embeddings --sizes 10000 100000 --components 64 128 256
+"""
+import argparse
+import time
+import numpy as np
+
+from benchmarks.synthetic import make_corpus, make_queries, fit_vectorizer
+from benchmarks.recommend_latency import measure
+from benchmarks.ann_recall import top_k_ids
+from src.dense_index import DenseEmbeddings, DENSE_DTYPES, quantize
+from src.recommender import RecipeRecommender
+from src.utils.query_cache import QueryCache
+
+
+def sparse_nbytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--components", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--dtypes", nargs="+", default=list(DENSE_DTYPES), choices=DENSE_DTYPES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    print(f"{'recipes':>10} {'mode':>14} {'MiB':>8} {'agree@k':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in args.sizes:
+        df = make_corpus(size)
+        vectorizer, tfidf_matrix = fit_vectorizer(df)
+        recommender = RecipeRecommender.from_artifacts(vectorizer, tfidf_matrix.astype(np.float32), df)
+        # Queries are repeated across settings, so results must not come from the cache
+        recommender.query_cache = QueryCache(max_size=0)
+
+        exact = top_k_ids(recommender, queries, args.top_k)
+        fn = lambda q: recommender.recommend_by_ingredients(q, top_k=args.top_k)
+        p50, p99 = measure(fn, queries)
+        mib = sparse_nbytes(recommender.tfidf_matrix) / 2**20
+        print(f"{size:>10} {'sparse':>14} {mib:>8.1f} {1.0:>8.3f} {p50:>8.3f} {p99:>8.3f}")
+
+        for n_components in args.components:
+            start = time.perf_counter()
+            float_index = DenseEmbeddings.build(tfidf_matrix, n_components)
+            build_time = time.perf_counter() - start
+            for dtype in args.dtypes:
+                dense_index = float_index
+                if dtype == "int8":
+                    dense_index = DenseEmbeddings(float_index.projection, *quantize(float_index.embeddings))
+                recommender.set_backend("dense", dense_index=dense_index)
+                dense = top_k_ids(recommender, queries, args.top_k)
+                agreement = np.mean([len(d & e) / len(e) for d, e in zip(dense, exact) if e])
+                p50, p99 = measure(fn, queries)
+                mode = f"{n_components}d {dtype}"
+                print(f"{size:>10} {mode:>14} {dense_index.nbytes() / 2**20:>8.1f} {agreement:>8.3f} {p50:>8.3f} {p99:>8.3f}")
+            print(f"{'':>10} SVD fit + projection for {n_components}d: {build_time:.1f}s")
+            recommender.dense_index = None
+        recommender.set_backend("exact")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Ranking quality and latency of the cosine and hybrid scorers on the serving index.
+
+Pantries are 2-5 single-word ingredient terms sampled from a random recipe, which is how a
+user with a few ingredients on hand searches. For the top-k results of every pantry the
+benchmark reports, averaged over results:
+
+  similarity  TF-IDF cosine between pantry and recipe
+  used        fraction of the pantry's terms the recipe uses
+  coverage    fraction of the recipe's terms the pantry covers
+  missing     recipe terms the pantry lacks, i.e. what would have to be bought
+
+and the recommend_by_ingredients latency percentiles with the result cache off. Run from
+the repository root:
+
+    python -m benchmarks.hybrid_scoring --queries 500 --target-calories 600
+"""
+import argparse
+import time
+import numpy as np
+
+from src.recommender import RecipeRecommender
+from src.scoring import CosineScorer, HybridScorer
+from src.utils.query_cache import QueryCache
+
+
+def make_pantries(recommender, n_queries, seed=0):
+    rng = np.random.default_rng(seed)
+    pantries = []
+    while len(pantries) < n_queries:
+        row = recommender.tfidf_matrix[int(rng.integers(recommender.base_rows))]
+        terms = row.indices[recommender.unigrams[row.indices]]
+        if len(terms) < 2:
+            continue
+        picked = rng.choice(terms, size=min(len(terms), int(rng.integers(2, 6))), replace=False)
+        pantries.append([recommender.autocomplete.term(term) for term in picked])
+    return pantries
+
+
+def evaluate(recommender, pantries, top_k, target_calories):
+    totals = {"similarity": [], "used": [], "coverage": [], "missing": [], "calorie_gap": []}
+    latencies = []
+    for pantry in pantries:
+        start = time.perf_counter()
+        results = recommender.recommend_by_ingredients(pantry, top_k=top_k, target_calories=target_calories)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rows = results.index.to_numpy()
+        input_vector = recommender.vectorizer.transform([" ".join(pantry)])
+        hits = recommender._pantry_hits(input_vector, rows)
+        counts = np.maximum(np.asarray(recommender.term_counts)[rows], 1)
+        totals["similarity"].extend(results["similarity"])
+        totals["used"].extend(hits / len(pantry))
+        totals["coverage"].extend(hits / counts)
+        totals["missing"].extend(counts - hits)
+        if target_calories is not None:
+            totals["calorie_gap"].extend(np.abs(results["calories"].to_numpy(dtype=float) - target_calories))
+    summary = {name: float(np.mean(values)) for name, values in totals.items() if values}
+    summary["p50_ms"], summary["p99_ms"] = np.percentile(latencies, [50, 99])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--target-calories", type=float, default=None)
+    args = parser.parse_args()
+
+    recommender = RecipeRecommender()
+    recommender.query_cache = QueryCache(max_size=0)
+    pantries = make_pantries(recommender, args.queries)
+
+    header = f"{'scorer':>8} {'similarity':>10} {'used':>6} {'coverage':>8} {'missing':>8}"
+    if args.target_calories is not None:
+        header += f" {'cal gap':>8}"
+    print(header + f" {'p50 ms':>8} {'p99 ms':>8}")
+    for name, scorer in (("cosine", CosineScorer()), ("hybrid", HybridScorer())):
+        recommender.scorer = scorer
+        evaluate(recommender, pantries[:20], args.top_k, args.target_calories)
+        result = evaluate(recommender, pantries, args.top_k, args.target_calories)
+        line = (
+            f"{name:>8} {result['similarity']:>10.3f} {result['used']:>6.2f} "
+            f"{result['coverage']:>8.2f} {result['missing']:>8.1f}"
+        )
+        if args.target_calories is not None:
+            line += f" {result['calorie_gap']:>8.0f}"
+        print(line + f" {result['p50_ms']:>8.3f} {result['p99_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
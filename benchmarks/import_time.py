@@ -0,0 +1,64 @@
+"""
+Import-time budget check for the serving modules.
+
+Each module is imported in a fresh interpreter several times; the median wall time must stay
+under --budget-ms, and none of the libraries that are meant to load lazily (NLTK, sklearn,
+matplotlib, seaborn, scipy.stats) may have been imported as a side effect. Exits with status
+1 when either check fails, so it can gate CI. Run from the repository root:
+
+    python -m benchmarks.import_time --budget-ms 1500
+"""
+import argparse
+import json
+import subprocess
+import sys
+import numpy as np
+
+MODULES = ("src.recommender", "src.loaders")
+LAZY_MODULES = ("nltk", "sklearn", "matplotlib", "seaborn", "scipy.stats")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module, runs):
+    seconds, loaded = [], set()
+    for _ in range(runs):
+        probe = PROBE.format(module=module, lazy=LAZY_MODULES)
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return seconds, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':>18} {'median ms':>10} {'min ms':>8} {'max ms':>8}  eagerly loaded")
+    for module in args.modules:
+        seconds, loaded = measure_import(module, args.runs)
+        median = 1000 * float(np.median(seconds))
+        over_budget = median > args.budget_ms
+        failed |= over_budget or bool(loaded)
+        print(
+            f"{module:>18} {median:>10.0f} {1000 * min(seconds):>8.0f} {1000 * max(seconds):>8.0f}  "
+            f"{', '.join(loaded) or '-'}{'  OVER BUDGET' if over_budget else ''}"
+        )
+
+    print(f"Budget {args.budget_ms:.0f} ms: {'FAILED' if failed else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Single-query latency of RecipeRecommender.recommend_by_ingredients against corpus size.
+
+Compares the argpartition scoring path with the previous copy-and-sort implementation.
+Run from the repository root:
+
+    python -m benchmarks.recommend_latency --sizes 1000 10000 100000
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from benchmarks.synthetic import make_corpus, make_queries, fit_vectorizer
+from src.recommender import RecipeRecommender
+from src.utils.query_cache import QueryCache
+
+
+def sort_based_recommend(recommender, df, input_ingredients, max_calories=None, top_k=5):
+    # Previous implementation: full-frame copy and sort on every query
+    input_vector = recommender.vectorizer.transform([" ".join(input_ingredients)])
+    similarity_scores = cosine_similarity(input_vector, recommender.tfidf_matrix).flatten()
+    filtered_df = df.copy()
+    filtered_df["similarity"] = similarity_scores
+    if max_calories is not None:
+        filtered_df = filtered_df[filtered_df["calories"] <= max_calories]
+    recommendations = filtered_df.sort_values(by="similarity", ascending=False).head(top_k).copy()
+    return recommendations[recommender.result_columns]
+
+
+def measure(fn, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-calories", type=float, default=800)
+    args = parser.parse_args()
+
+    queries = make_queries(args.queries)
+    print(f"{'recipes':>10} {'path':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for size in args.sizes:
+        df = make_corpus(size)
+        vectorizer, tfidf_matrix = fit_vectorizer(df)
+        recommender = RecipeRecommender.from_artifacts(vectorizer, tfidf_matrix, df)
+        # Queries are repeated across settings, so results must not come from the cache
+        recommender.query_cache = QueryCache(max_size=0)
+
+        paths = {
+            "argpartition": lambda q: recommender.recommend_by_ingredients(q, args.max_calories, args.top_k),
+            "sort": lambda q: sort_based_recommend(recommender, df, q, args.max_calories, args.top_k),
+        }
+        for name, fn in paths.items():
+            p50, p99 = measure(fn, queries)
+            print(f"{size:>10} {name:>12} {p50:>10.3f} {p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
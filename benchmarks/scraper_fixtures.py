@@ -0,0 +1,253 @@
+"""
+Runs AsyncRecipeScraper against a local stand-in for the recipe site serving fixture HTML.
+
+An aiohttp server on 127.0.0.1 renders the listing, recipe and nutrition pages from
+benchmarks/fixtures/scraper with a fixed delay per response. Nutrition pages are served on
+"localhost", so they count as a second host with its own limiter, like the real iframe host.
+Some recipes answer 429 or 5xx before succeeding, one always answers 500 and one 404. The
+run checks that:
+
+  parsing      every reachable recipe is scraped with the fields it was rendered from, and
+               listing entries whose title starts with a digit are skipped
+  concurrency  no host ever has more than --concurrency requests in flight
+  rate limit   request starts per host stay within --rate-limit per second
+  retries      429/5xx are retried until they succeed or the retries run out; 404 is not
+  resume       a second crawl through the same RecipeSink fetches no stored recipe again
+
+It prints the crawl throughput and exits with status 1 if any check fails, so it can gate CI.
+Run from the repository root:
+
+    python -m benchmarks.scraper_fixtures --recipes 60 --concurrency 4 --rate-limit 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from string import Template
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+from src.scraping.async_scraper import AsyncRecipeScraper
+from src.scraping.recipe_sink import RecipeSink
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "scraper")
+PER_PAGE = 12
+INGREDIENTS = (
+    "2 cups cooked rice", "1 lb. chicken thighs", "1 tablespoon olive oil", "3 cloves garlic, minced",
+    "1 can black beans, drained", "1/2 cup salsa", "1 red onion, thinly sliced", "salt and pepper",
+)
+
+# Recipe id -> statuses answered before the page is served
+FLAKY = {3: [429], 7: [503, 503], 11: [502]}
+# Recipe id -> status answered on every request
+GONE = {13: 500, 17: 404}
+
+
+def load_templates():
+    templates = {}
+    for name in ("list", "article", "recipe", "nutrition"):
+        with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+            templates[name] = Template(f.read())
+    return templates
+
+
+def fixture_recipe(i):
+    """The recipe rendered for id i, in the form AsyncRecipeScraper returns it."""
+    return {
+        "image": f"https://images.example.com/recipe-{i}.jpg",
+        "title": f"Fixture Recipe {i}",
+        "description": f"Stand-in recipe number {i}.",
+        "total time": f"{10 + i % 50} minutes",
+        "ingredients": [INGREDIENTS[(i + k) % len(INGREDIENTS)] for k in range(3 + i % 4)],
+        "instructions": [f"Step {k + 1} of recipe {i}." for k in range(2 + i % 3)],
+        "calories": 200 + 7 * i,
+        "serves": 1 + i % 6,
+    }
+
+
+class FixtureSite:
+    """Serves the fixture pages and records what every host was asked for, and when."""
+
+    def __init__(self, n_recipes, delay):
+        self.n_recipes = n_recipes
+        self.delay = delay
+        self.templates = load_templates()
+        self.port = None
+        self.attempts = defaultdict(int)
+        self.in_flight = defaultdict(int)
+        self.max_in_flight = defaultdict(int)
+        self.starts = defaultdict(list)
+
+    @property
+    def list_url(self):
+        return f"http://127.0.0.1:{self.port}/recipes/all"
+
+    def recipe_url(self, i):
+        return f"http://127.0.0.1:{self.port}/recipes/{i}"
+
+    def nutrition_url(self, i):
+        return f"http://localhost:{self.port}/nutrition/{i}"
+
+    def app(self):
+        app = web.Application(middlewares=[self.record])
+        app.router.add_get("/recipes/all", self.listing)
+        app.router.add_get("/recipes/all/page/{page}", self.listing)
+        app.router.add_get("/recipes/{id}", self.recipe)
+        app.router.add_get("/nutrition/{id}", self.nutrition)
+        return app
+
+    @web.middleware
+    async def record(self, request, handler):
+        host = request.host.split(":")[0]
+        self.starts[host].append(time.monotonic())
+        self.attempts[request.path] += 1
+        self.in_flight[host] += 1
+        self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        try:
+            await asyncio.sleep(self.delay)
+            return await handler(request)
+        finally:
+            self.in_flight[host] -= 1
+
+    @property
+    def total_pages(self):
+        # The last entry of every page is a post whose title starts with a digit
+        return -(-self.n_recipes // (PER_PAGE - 1))
+
+    async def listing(self, request):
+        page = int(request.match_info.get("page", 1))
+        articles = []
+        for slot in range((page - 1) * PER_PAGE, page * PER_PAGE):
+            if slot % PER_PAGE == PER_PAGE - 1:
+                # A round-up post, not a recipe; the crawler must skip it
+                url, title = f"http://127.0.0.1:{self.port}/posts/{slot}", f"{slot} Weeknight Dinners"
+            else:
+                i = slot - slot // PER_PAGE
+                if i >= self.n_recipes:
+                    break
+                url, title = self.recipe_url(i), fixture_recipe(i)["title"]
+            articles.append(self.templates["article"].substitute(url=url, image="", title=title))
+        return self.html("list", list_url=self.list_url, total_pages=self.total_pages, articles="".join(articles))
+
+    async def recipe(self, request):
+        i = int(request.match_info["id"])
+        failure = self.failure(request.path, i)
+        if failure:
+            return failure
+        recipe = fixture_recipe(i)
+        ingredients = "".join(
+            f'      <li><input type="checkbox" aria-label="{line}"> {line}</li>\n' for line in recipe["ingredients"]
+        )
+        instructions = "".join(f"      <li>{step}</li>\n" for step in recipe["instructions"])
+        return self.html(
+            "recipe", image=recipe["image"], title=recipe["title"], total_time=recipe["total time"],
+            description=recipe["description"], ingredients=ingredients, instructions=instructions,
+            nutrition_url=self.nutrition_url(i),
+        )
+
+    async def nutrition(self, request):
+        recipe = fixture_recipe(int(request.match_info["id"]))
+        return self.html("nutrition", servings=recipe["serves"], calories=f"{recipe['calories']}.0")
+
+    def failure(self, path, i):
+        if i in GONE:
+            return web.Response(status=GONE[i])
+        statuses = FLAKY.get(i, [])
+        attempt = self.attempts[path]
+        if attempt <= len(statuses):
+            return web.Response(status=statuses[attempt - 1])
+        return None
+
+    def html(self, template, **fields):
+        return web.Response(text=self.templates[template].substitute(**fields), content_type="text/html")
+
+
+async def crawl(site, args, sink):
+    runner = web.AppRunner(site.app())
+    await runner.setup()
+    server = web.TCPSite(runner, "127.0.0.1", 0)
+    await server.start()
+    site.port = runner.addresses[0][1]
+    try:
+        scraper = AsyncRecipeScraper(
+            list_url=site.list_url, headers={}, concurrency=args.concurrency, rate_limit=args.rate_limit,
+            retries=args.retries, timeout=10, backoff=0.01,
+        )
+        start = time.perf_counter()
+        recipes = await scraper.crawl(on_recipe=sink.add, skip_urls=sink.scraped_urls)
+        seconds = time.perf_counter() - start
+        attempts_before = dict(site.attempts)
+        await scraper.crawl(on_recipe=sink.add, skip_urls=sink.scraped_urls)
+        stored = {urlsplit(url).path for url in sink.scraped_urls}
+        refetched = sorted(path for path in stored if site.attempts[path] > attempts_before[path])
+        return recipes, seconds, attempts_before, refetched
+    finally:
+        await runner.cleanup()
+
+
+def check(site, args, recipes, attempts, refetched):
+    failures = []
+    expected = {fixture_recipe(i)["title"]: fixture_recipe(i) for i in range(args.recipes) if i not in GONE}
+    scraped = {recipe["title"]: recipe for recipe in recipes}
+    if scraped.keys() != expected.keys():
+        failures.append(f"parsing: scraped {sorted(scraped.keys() ^ expected.keys())} unexpectedly or not at all")
+    failures += [f"parsing: {title} scraped as {scraped[title]}" for title in expected.keys() & scraped.keys()
+                 if scraped[title] != expected[title]]
+    if any(path.startswith("/posts/") for path in attempts):
+        failures.append("parsing: a listing entry with a leading digit was followed")
+
+    for host, peak in site.max_in_flight.items():
+        if peak > args.concurrency:
+            failures.append(f"concurrency: {peak} requests in flight on {host}, limit {args.concurrency}")
+    for host, starts in site.starts.items():
+        # Windows of rate_limit consecutive starts must span about a second
+        k = int(args.rate_limit)
+        shortest = min((starts[j + k] - starts[j] for j in range(len(starts) - k)), default=None)
+        if shortest is not None and shortest < 0.9 * k / args.rate_limit:
+            failures.append(f"rate limit: {k + 1} requests to {host} within {shortest:.3f}s")
+
+    expected_attempts = {i: len(statuses) + 1 for i, statuses in FLAKY.items()}
+    expected_attempts.update({i: 1 if status == 404 else args.retries + 1 for i, status in GONE.items()})
+    for i, n in sorted(expected_attempts.items()):
+        got = attempts.get(f"/recipes/{i}", 0)
+        if got != n:
+            failures.append(f"retries: recipe {i} requested {got} times, expected {n}")
+
+    if refetched:
+        failures.append(f"resume: the second crawl fetched the stored recipes {refetched} again")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate-limit", type=float, default=50.0, help="requests per second per host")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds the server takes per response")
+    args = parser.parse_args()
+    if args.recipes <= max(*FLAKY, *GONE) or args.retries < max(map(len, FLAKY.values())):
+        parser.error(f"--recipes must exceed {max(*FLAKY, *GONE)} and --retries cover every scheduled failure")
+
+    site = FixtureSite(args.recipes, args.delay)
+    with tempfile.TemporaryDirectory() as tmp, RecipeSink(tmp) as sink:
+        recipes, seconds, attempts, refetched = asyncio.run(crawl(site, args, sink))
+
+    failures = check(site, args, recipes, attempts, refetched)
+    for failure in failures:
+        print(failure)
+    requests = sum(attempts.values())
+    print(
+        f"{len(recipes)} recipes, {requests} requests in {seconds:.2f}s ({len(recipes) / seconds:.1f} recipes/s); "
+        f"peak in flight {dict(site.max_in_flight)}"
+    )
+    print("All checks passed." if not failures else f"{len(failures)} checks failed.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
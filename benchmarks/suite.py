@@ -0,0 +1,268 @@
+"""
+End-to-end benchmark suite: build, startup and query paths on synthetic corpora, as JSON.
+
+Every corpus size runs in its own spawned process, so peak RSS and import/startup times are
+not inflated by earlier sizes. For each size the suite measures:
+
+  preprocess   Preprocessor.clean_ingredients on up to --preprocess-sample raw recipes,
+               cold (caches cleared) and warm, in recipes per second
+  build        the real index build, RecipeVectorizer.run_streaming_pipeline (or run_pipeline
+               with --build batch) over the corpus written as raw CSV: seconds and peak RSS
+               growth of every stage (cleaning and vocabulary, TF-IDF rows with postings and
+               ingredient statistics, neighbors, term counts, ANN and dense indexes). The
+               quadratic neighbor stage is skipped above --neighbors-max-size recipes
+  startup      importing src.recommender and constructing RecipeRecommender() on that index
+  query        recommend_by_ingredients latency percentiles, result cache off
+  query_cached the same queries again once they are all in the result cache
+  batch        recommend_batch latency percentiles per batch of --batch-size queries
+  peak_rss     peak resident set size of the process
+
+Corpora and queries are seeded, so two runs on the same commit differ only by machine noise.
+Run from the repository root and compare two result files:
+
+    python -m benchmarks.suite --sizes 1000 10000 100000 1000000 --output bench.json
+    python -m benchmarks.suite --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from src.utils.memory import PeakTracker
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentiles(latencies):
+    return {f"p{q}_ms": float(np.percentile(latencies, q)) for q in PERCENTILES}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def peak_rss_mib():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageRecorder:
+    """
+    Wraps methods of an object so every call records its seconds and how far the peak RSS
+    rose above the RSS at its start. Stages may nest; an outer stage's peak includes its
+    inner ones.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.peaks = PeakTracker()
+
+    def wrap(self, obj, names):
+        for name in names:
+            setattr(obj, name, self._timed(name, getattr(obj, name)))
+
+    def _timed(self, name, method):
+        def run(*args, **kwargs):
+            self.peaks.enter()
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                peak = self.peaks.exit()
+                self.stages[name] = {"s": seconds} if peak is None else {"s": seconds, "peak_mib": peak}
+        return run
+
+
+BUILD_STAGES = {
+    "streaming": (
+        "stream_vocabulary", "stream_tfidf_matrix", "write_neighbor_index", "write_term_counts",
+        "write_ann_index", "write_dense_embeddings",
+    ),
+    "batch": (
+        "load_and_preprocess", "train_vectorizer", "build_neighbor_index", "save_models",
+        "write_term_counts", "write_ann_index", "write_dense_embeddings",
+    ),
+}
+
+
+def build_index(directory, df, mode="streaming", neighbors=True):
+    """Builds the index with RecipeVectorizer into directory/index; returns the recorded stages."""
+    from benchmarks.synthetic import make_trainer
+
+    trainer = make_trainer(directory, df, neighbors)
+    recorder = StageRecorder()
+    recorder.wrap(trainer, BUILD_STAGES[mode])
+    # The pipeline reports progress on stdout; the suite prints its own summary
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.run_streaming_pipeline() if mode == "streaming" else trainer.run_pipeline()
+    return recorder.stages
+
+
+def run_size(size, args):
+    """Runs every stage for one corpus size; meant to be the only work of a fresh process."""
+    from benchmarks.synthetic import make_corpus, make_queries
+
+    result = {"recipes": size}
+    df, result["generate_s"] = timed(make_corpus, size)
+    queries = make_queries(args.queries)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The recommender reads these at import time, so they are set before importing it
+        os.environ["INDEX_DIR"] = os.path.join(tmp, "index")
+        os.environ["DELTA_PATH"] = os.path.join(tmp, "delta.pkl")
+        os.environ["QUERY_CACHE_SIZE"] = "0"
+
+        start = time.perf_counter()
+        from src.utils.preprocess import Preprocessor
+        result["import_preprocess_s"] = time.perf_counter() - start
+
+        sample = df["ingredients"].iloc[:args.preprocess_sample].tolist()
+        for mode in ("cold", "warm"):
+            if mode == "cold":
+                Preprocessor.clear_caches()
+            _, seconds = timed(lambda: [Preprocessor.clean_ingredients(raw) for raw in sample])
+            result[f"preprocess_{mode}_recipes_per_s"] = len(sample) / seconds
+
+        neighbors = size <= args.neighbors_max_size
+        stages, build_s = timed(build_index, tmp, df, args.build, neighbors)
+        result["build"] = {"mode": args.build, "neighbors": neighbors, "total_s": build_s, "stages": stages}
+        del df
+
+        start = time.perf_counter()
+        from src.recommender import RecipeRecommender
+        result["import_recommender_s"] = time.perf_counter() - start
+        recommender, result["startup_s"] = timed(RecipeRecommender)
+
+        latencies = []
+        for query in queries:
+            _, seconds = timed(recommender.recommend_by_ingredients, query, args.max_calories, args.top_k)
+            latencies.append(seconds * 1000)
+        result["query"] = percentiles(latencies)
+
+        from src.utils.query_cache import QueryCache
+        recommender.query_cache = QueryCache(max_size=len(queries))
+        for query in queries:
+            recommender.recommend_by_ingredients(query, args.max_calories, args.top_k)
+        latencies = []
+        for query in queries:
+            _, seconds = timed(recommender.recommend_by_ingredients, query, args.max_calories, args.top_k)
+            latencies.append(seconds * 1000)
+        result["query_cached"] = percentiles(latencies)
+        recommender.query_cache = QueryCache(max_size=0)
+
+        latencies = []
+        for start in range(0, len(queries), args.batch_size):
+            batch = queries[start:start + args.batch_size]
+            _, seconds = timed(recommender.recommend_batch, batch, args.max_calories, args.top_k)
+            latencies.append(seconds * 1000)
+        result["batch"] = {"batch_size": args.batch_size, **percentiles(latencies)}
+        result["batch"]["per_query_ms"] = float(np.sum(latencies) / len(queries))
+
+    result["peak_rss_mib"] = peak_rss_mib()
+    return result
+
+
+def print_result(result):
+    query, batch, build = result["query"], result["batch"], result["build"]
+    print(
+        f"{result['recipes']:>9} | preprocess {result['preprocess_cold_recipes_per_s']:>7.0f}/s cold "
+        f"{result['preprocess_warm_recipes_per_s']:>7.0f}/s warm | build {build['total_s']:>7.2f}s "
+        f"| startup {result['startup_s']:>6.3f}s "
+        f"| query p50 {query['p50_ms']:>7.3f} p99 {query['p99_ms']:>7.3f} ms "
+        f"(cached p50 {result['query_cached']['p50_ms']:>6.3f}) "
+        f"| batch {batch['per_query_ms']:>6.3f} ms/query | rss {result['peak_rss_mib']:>7.1f} MiB"
+    )
+    for name, stage in build["stages"].items():
+        peak = f" +{stage['peak_mib']:.1f} MiB" if "peak_mib" in stage else ""
+        print(f"{'':>9} | {name:<24} {stage['s']:>8.2f}s{peak}")
+
+
+def flatten(result, prefix=""):
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in ("recipes", "batch_size"):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(before_path, after_path):
+    """Prints after/before ratios of every metric, per corpus size present in both runs."""
+    with open(before_path) as f:
+        before = {r["recipes"]: flatten(r) for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = {r["recipes"]: flatten(r) for r in json.load(f)["results"]}
+
+    print(f"{'recipes':>9} {'metric':>34} {'before':>12} {'after':>12} {'ratio':>7}")
+    for size in sorted(before.keys() & after.keys()):
+        for metric, old in before[size].items():
+            new = after[size].get(metric)
+            if new is None:
+                continue
+            ratio = new / old if old else float("nan")
+            print(f"{size:>9} {metric:>34} {old:>12.4g} {new:>12.4g} {ratio:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-calories", type=float, default=800)
+    parser.add_argument("--preprocess-sample", type=int, default=5000)
+    parser.add_argument("--build", choices=sorted(BUILD_STAGES), default="streaming", help="index build pipeline")
+    parser.add_argument("--neighbors-max-size", type=int, default=100000, help="largest corpus the neighbor index is built for")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(run_size, (size, args))
+        print_result(result)
+        report["results"].append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+BASE_INGREDIENTS = [
+    "chicken", "rice", "garlic", "onion", "tomato", "olive oil", "butter", "salt", "pepper",
+    "black bean", "sweet potato", "cilantro", "lime", "avocado", "cheese", "parmesan", "pasta",
+    "spinach", "mushroom", "ginger", "soy sauce", "honey", "lemon", "yogurt", "cumin", "paprika",
+    "coconut milk", "broccoli", "carrot", "egg", "flour", "sugar", "beef", "pork", "bacon",
+]
+QUANTITIES = ["1", "2", "1/2", "3/4", "1 1/2", "4", "8"]
+UNITS = ["cup", "cups", "tablespoon", "teaspoon", "tsp.", "oz", "pound", "grams", ""]
+PREPARATIONS = ["", "", "", ", chopped", ", minced", " (optional)", ", thinly sliced"]
+
+
+def synthetic_suffix(i, width=4):
+    letters = []
+    for _ in range(width):
+        i, digit = divmod(i, 26)
+        letters.append(chr(ord("a") + digit))
+    return "".join(reversed(letters))
+
+
+def make_vocabulary(n_terms=3000, seed=0):
+    """Real ingredient names followed by synthetic ones, ordered by popularity."""
+    rng = np.random.default_rng(seed)
+    # Letters only: ingredient cleaning strips digits, so numbered names would all collapse
+    extra = [f"ingr{synthetic_suffix(i)}" for i in range(max(0, n_terms - len(BASE_INGREDIENTS)))]
+    extra = list(rng.permutation(extra))
+    return BASE_INGREDIENTS + extra
+
+
+def make_corpus(n_recipes, n_terms=3000, seed=0) -> pd.DataFrame:
+    """Generates a recipe table shaped like data/processed/recipes.pkl with Zipf-distributed ingredients."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(make_vocabulary(n_terms, seed), dtype=object)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    lengths = rng.integers(6, 18, size=n_recipes)
+    picks = rng.choice(len(vocabulary), size=lengths.sum(), p=weights)
+    splits = np.split(picks, np.cumsum(lengths)[:-1])
+
+    ingredients = [list(dict.fromkeys(vocabulary[ids])) for ids in splits]
+    # Raw lines vary in quantity, unit and preparation like scraped ones, so cleaning them
+    # is not one cache hit per ingredient
+    line_rng = np.random.default_rng(seed + 1)
+    n_lines = sum(len(items) for items in ingredients)
+    quantities = line_rng.choice(QUANTITIES, n_lines)
+    units = line_rng.choice(UNITS, n_lines)
+    preparations = line_rng.choice(PREPARATIONS, n_lines)
+    lines = iter(f"{q} {u} {item}{p}" for q, u, item, p in zip(
+        quantities, units, (item for items in ingredients for item in items), preparations
+    ))
+    return pd.DataFrame({
+        "image": [f"https://example.com/{i}.jpg" for i in range(n_recipes)],
+        "title": [f"Recipe {i}" for i in range(n_recipes)],
+        "description": "",
+        "total time": "30 minutes",
+        "ingredients": [str([next(lines) for _ in items]) for items in ingredients],
+        "instructions": "['Cook everything.']",
+        "calories": rng.integers(100, 1500, size=n_recipes),
+        "serves": rng.integers(1, 8, size=n_recipes),
+        "ingredients_cleaned": [" ".join(items) for items in ingredients],
+    })
+
+
+def make_queries(n_queries, n_terms=3000, seed=1):
+    """Random pantries of 2-6 ingredients drawn with the same popularity skew as the corpus."""
+    rng = np.random.default_rng(seed)
+    vocabulary = make_vocabulary(n_terms)
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+    return [
+        [vocabulary[i] for i in rng.choice(len(vocabulary), size=rng.integers(2, 7), p=weights)]
+        for _ in range(n_queries)
+    ]
+
+
+def fit_vectorizer(df):
+    """Fits the same TF-IDF configuration RecipeVectorizer uses."""
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=4, max_df=0.8)
+    tfidf_matrix = vectorizer.fit_transform(df["ingredients_cleaned"])
+    return vectorizer, tfidf_matrix
+
+
+def make_trainer(directory, df, neighbors=True):
+    """
+    A RecipeVectorizer whose raw CSV, cleaned CSV, delta and index all live in directory, with
+    the synthetic corpus written as its raw input; run_pipeline() or run_streaming_pipeline()
+    then builds the index exactly as for the real catalog, into directory/index.
+    """
+    from src.recipe_vectorizer import RecipeVectorizer
+
+    trainer = RecipeVectorizer()
+    trainer.raw_path = os.path.join(directory, "raw.csv")
+    trainer.output_path = os.path.join(directory, "recipes_clean.csv")
+    trainer.delta_path = os.path.join(directory, "delta.pkl")
+    trainer.index_dir = os.path.join(directory, "index")
+    trainer.neighbors_path = None
+    if not neighbors:
+        trainer.neighbors_top_k = 0
+    df.drop(columns="ingredients_cleaned").to_csv(trainer.raw_path, index=False)
+    return trainer
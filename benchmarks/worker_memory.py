@@ -0,0 +1,108 @@
+"""
+Resident memory one Streamlit worker spends on the recommender, per way of loading the recipes.
+
+Each mode runs in a fresh process: the memory counters are read after importing
+src.recommender, then after constructing RecipeRecommender() and answering --queries
+queries. Modes:
+
+  dataframe  the pickled recipe DataFrame held whole, as the recommender used to keep it
+  pickle     legacy pickled artifacts, recipes converted to typed columns
+  index      the memory-mapped index (INDEX_DIR)
+
+rss is the resident set, split into anonymous memory (heap, owned by this worker alone)
+and file pages, which every worker mapping the same index shares through the OS page cache
+(Linux /proc/self/smaps_rollup). With --size the artifacts are a synthetic corpus written
+to a temporary directory. Run from the repository root:
+
+    python -m benchmarks.worker_memory
+    python -m benchmarks.worker_memory --size 100000
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import tempfile
+
+MODES = ("dataframe", "pickle", "index")
+
+
+def memory_mib():
+    """Current resident, anonymous and file-backed memory of this process, in MiB."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields["Rss"] / 1024,
+        "anonymous": fields["Anonymous"] / 1024,
+        "file": (fields["Rss"] - fields["Anonymous"]) / 1024,
+    }
+
+
+def measure(mode, environment, n_queries):
+    """Meant to be the only work of a fresh process: the environment is applied before importing."""
+    os.environ.update(environment)
+    if mode != "index":
+        os.environ["INDEX_DIR"] = ""
+
+    from benchmarks.synthetic import make_queries
+    import src.recommender as recommender_module
+
+    baseline = memory_mib()
+    if mode == "dataframe":
+        with open(os.environ["RECIPES_PATH"], "rb") as f:
+            recipes = pickle.load(f)
+        loaded = memory_mib()
+        del recipes
+    else:
+        recommender = recommender_module.RecipeRecommender()
+        for query in make_queries(n_queries, n_terms=200):
+            recommender.recommend_by_ingredients(query, max_calories=800)
+        loaded = memory_mib()
+    return {key: loaded[key] - baseline[key] for key in baseline}
+
+
+def write_synthetic(directory, size):
+    """Builds legacy pickles and an index for a synthetic corpus; returns the environment pointing at them."""
+    from benchmarks.synthetic import make_corpus, make_trainer
+
+    # The neighbor index only matters to similar_recipes, not to the queries measured here
+    trainer = make_trainer(directory, make_corpus(size), neighbors=False)
+    trainer.run_pipeline()
+    environment = {
+        "VECTORIZER_PATH": os.path.join(directory, "vectorizer.pkl"),
+        "TFIDF_MATRIX_PATH": os.path.join(directory, "tfidf_matrix.pkl"),
+        "RECIPES_PATH": os.path.join(directory, "recipes.pkl"),
+        "INDEX_DIR": trainer.index_dir,
+        "NEIGHBORS_PATH": "",
+    }
+    for name, value in (("VECTORIZER_PATH", trainer.vectorizer), ("TFIDF_MATRIX_PATH", trainer.tfidf_matrix), ("RECIPES_PATH", trainer.df)):
+        with open(environment[name], "wb") as f:
+            pickle.dump(value, f)
+    return environment
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=0, help="synthetic corpus size; 0 uses the .env artifacts")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        environment = {"DELTA_PATH": os.path.join(tmp, "delta.pkl"), "QUERY_CACHE_SIZE": "0"}
+        if args.size:
+            environment.update(write_synthetic(tmp, args.size))
+
+        context = multiprocessing.get_context("spawn")
+        print(f"{'mode':>10} {'rss MiB':>9} {'anonymous MiB':>14} {'file MiB':>9}")
+        for mode in args.modes:
+            with context.Pool(1) as pool:
+                result = pool.apply(measure, (mode, environment, args.queries))
+            print(f"{mode:>10} {result['rss']:>9.1f} {result['anonymous']:>14.1f} {result['file']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
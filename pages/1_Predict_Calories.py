@@ -1,9 +1,9 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
+from src.loaders import ModelLoader
 from src.utils.preprocess import Preprocessor
 
-calorie_models = st.session_state.calorie_models
+ModelLoader.ensure_models_loaded(calorie_predictor=True)
+calorie_predictor = st.session_state.calorie_predictor
 
 st.header("Predict Calories from Ingredients")
 
@@ -16,25 +16,17 @@ if st.button("Predict Calories"):
     if user_input:
         # Split and clean input
         ingredients_list = [ing.strip() for ing in user_input.replace(",", "\n").split("\n") if ing.strip()]
-        cleaned_ingredients = Preprocessor.clean_ingredients(ingredients_list)
-        cleaned_text = " ".join(cleaned_ingredients)
-        
-        if not cleaned_text:
+        pred, class_pred = calorie_predictor.predict(ingredients_list)
+
+        if class_pred is None:
             st.warning("No valid ingredients after cleaning. Try again!")
         else:
-            # Vectorize and predict
-            X_new = calorie_models["vectorizer"].transform([cleaned_text])
-            X_new_dense = calorie_models["scaler"].transform(X_new)
-
-            #Regression
-            pred = calorie_models["regressor"].predict(X_new_dense)[0]
-            #classification
-            class_pred = calorie_models["classifier"].predict(X_new)[0]
-            
-            if calorie_models["was_log_transformed"]:
-                pred = np.expm1(pred)
-            calories_per_serving = round(pred)
-            
             st.success(f"Predicted Calories: **{pred:.0f}** (per serving) - **{class_pred} calories** recipe")
+
+        stats = Preprocessor.cache_stats()
+        st.caption(
+            f"Preprocessing cache hit rate: {stats['clean_text']['hit_rate']:.0%} of ingredient lines, "
+            f"{stats['lemmatize']['hit_rate']:.0%} of lemmas"
+        )
     else:
         st.info("Enter some ingredients to predict!")
@@ -2,9 +2,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import pickle
+import os
 import matplotlib.pyplot as plt
 import seaborn as sns
-from collections import Counter, defaultdict
+from dotenv import load_dotenv
+from src.index_store import index_exists
+from src.eda_summary import build_eda_summary, load_eda_summary
+
+load_dotenv()
 
 st.set_page_config(page_title="Recipe EDA", layout="wide")
 
@@ -14,51 +19,33 @@ st.title("Recipe Descriptive Statistics & EDA")
 # Load data
 # ------------------------
 @st.cache_data
-def load_data():
+def load_summary():
+    # Features and aggregates are computed once by the offline build (RecipeVectorizer)
+    index_dir = os.getenv("INDEX_DIR")
+    summary = load_eda_summary(index_dir) if index_exists(index_dir) else None
+    if summary is not None:
+        return summary
     with open("data/processed/recipes.pkl", "rb") as f:
-        return pickle.load(f)
-
-df = load_data()
-
-# ------------------------
-# Feature Engineering
-# ------------------------
-df["num_ingredients"] = df["ingredients"].apply(lambda x: len(x.split()))
-df["calories_per_ingredient"] = df["calories"] / df["num_ingredients"]
+        return build_eda_summary(pickle.load(f))
 
-def count_steps(instructions):
-    if isinstance(instructions, list):
-        return len(instructions)
-    return instructions.count(".")
+summary = load_summary()
 
-df["num_steps"] = df["instructions"].apply(count_steps)
-
-def difficulty(steps):
-    if steps <= 5:
-        return "Easy"
-    elif steps <= 10:
-        return "Medium"
-    return "Hard"
-
-df["difficulty"] = df["num_steps"].apply(difficulty)
-
-MEAT = ["chicken", "beef", "pork", "lamb", "bacon", "turkey"]
-df["is_vegetarian"] = df["ingredients"].apply(
-    lambda x: not any(m in x for m in MEAT)
-)
-
-HIGH_CAL = ["oil", "butter", "olive"]
-df["has_oil_butter"] = df["ingredients"].apply(
-    lambda x: any(h in x for h in HIGH_CAL)
-)
+def draw_boxplot(ax, stats, xlabel, ylabel):
+    ax.bxp([dict(stat, fliers=np.asarray(stat["fliers"])) for stat in stats], patch_artist=True)
+    ax.set_xticklabels([stat["label"] for stat in stats])
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
 
 # ------------------------
 # 1. Calories Distribution
 # ------------------------
 st.header("1️- Distribution of Calories")
 
+histogram = summary["calories_histogram"]
 fig, ax = plt.subplots()
-sns.histplot(df["calories"], bins=40, kde=True, ax=ax)
+sns.histplot(x=histogram["edges"][:-1], weights=histogram["counts"], bins=histogram["edges"], ax=ax)
+ax.plot(histogram["kde_x"], histogram["kde_y"])
+ax.set_xlabel("calories")
 st.pyplot(fig)
 
 # ------------------------
@@ -67,7 +54,7 @@ st.pyplot(fig)
 st.header("2- Recipe Difficulty vs Steps")
 
 fig, ax = plt.subplots()
-sns.boxplot(data=df, x="difficulty", y="num_steps", ax=ax)
+draw_boxplot(ax, summary["steps_by_difficulty"], "difficulty", "num_steps")
 st.pyplot(fig)
 
 # ------------------------
@@ -75,14 +62,7 @@ st.pyplot(fig)
 # ------------------------
 st.header("3- Ingredient Frequency Distribution")
 
-all_ingredients = " ".join(df["ingredients_cleaned"]).split()
-ingredient_counts = Counter(all_ingredients)
-
-ingredient_freq_df = (
-    pd.DataFrame(ingredient_counts.items(), columns=["ingredient", "count"])
-    .sort_values(by="count", ascending=False)
-    .head(20)
-)
+ingredient_freq_df = pd.DataFrame(summary["top_ingredients"], columns=["ingredient", "count"])
 
 fig, ax = plt.subplots()
 sns.barplot(data=ingredient_freq_df, y="ingredient", x="count", ax=ax)
@@ -94,7 +74,7 @@ st.pyplot(fig)
 st.header("4- Calories vs Oil / Butter")
 
 fig, ax = plt.subplots()
-sns.boxplot(data=df, x="has_oil_butter", y="calories", ax=ax)
+draw_boxplot(ax, summary["calories_by_oil_butter"], "has_oil_butter", "calories")
 st.pyplot(fig)
 
 # ------------------------
@@ -103,7 +83,7 @@ st.pyplot(fig)
 st.header("5- Vegetarian vs Non-Vegetarian Calories")
 
 fig, ax = plt.subplots()
-sns.boxplot(data=df, x="is_vegetarian", y="calories", ax=ax)
+draw_boxplot(ax, summary["calories_by_vegetarian"], "is_vegetarian", "calories")
 st.pyplot(fig)
 
 st.success("EDA dashboard loaded successfully")
\ No newline at end of file
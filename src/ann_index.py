@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+
+META_FILE = "meta.json"
+# Rows read at once, and entries gathered per block of terms, while building
+ROW_CHUNK = 8192
+BUILD_BLOCK_ENTRIES = 1 << 20
+
+
+class ImpactIndex:
+    """
+    Approximate candidate search over the TF-IDF rows with impact-ordered term postings.
+
+    For every term, the recipes containing it are stored by descending TF-IDF weight, i.e. by
+    how much the term can add to their cosine score. A query reads only the first depth
+    entries of each of its terms' lists, and only those recipes are scored exactly. Recipes
+    that rank well almost always carry a high weight on at least one query term, so a shallow
+    depth already finds most of the exact top-k; depth trades recall for latency.
+    """
+
+    def __init__(self, offsets, rows, max_depth):
+        self.offsets = offsets
+        self.rows = rows
+        self.max_depth = max_depth
+
+    @classmethod
+    def build(cls, tfidf_matrix, max_depth=None, block_entries=BUILD_BLOCK_ENTRIES):
+        """
+        Lists are cut to max_depth entries per term, which bounds the index size. The matrix
+        is read ROW_CHUNK rows at a time, once per block of terms holding about block_entries
+        entries, so it can stay memory-mapped and is never copied or transposed whole.
+        """
+        n_rows, n_terms = tfidf_matrix.shape
+        if not n_rows:
+            return cls(np.zeros(n_terms + 1, dtype=np.int64), np.empty(0, dtype=np.int32), max_depth or 0)
+        counts = np.zeros(n_terms, dtype=np.int64)
+        for start in range(0, n_rows, ROW_CHUNK):
+            counts += np.bincount(tfidf_matrix[start:start + ROW_CHUNK].indices, minlength=n_terms)
+        kept = np.minimum(counts, max_depth) if max_depth else counts
+        offsets = np.concatenate([[0], np.cumsum(kept)]).astype(np.int64)
+        rows = np.empty(offsets[-1], dtype=np.int32)
+
+        # Consecutive terms whose entries add up to about block_entries; a term larger than
+        # that gets a block of its own
+        total = np.cumsum(counts)
+        block_starts = [0]
+        while block_starts[-1] < n_terms:
+            first = block_starts[-1]
+            limit = (total[first - 1] if first else 0) + block_entries
+            block_starts.append(max(first + 1, int(np.searchsorted(total, limit, side="right"))))
+        block_starts[-1] = n_terms
+
+        for first, last in zip(block_starts[:-1], block_starts[1:]):
+            block_rows, block_terms, block_weights = [], [], []
+            for start in range(0, n_rows, ROW_CHUNK):
+                chunk = tfidf_matrix[start:start + ROW_CHUNK]
+                in_block = (chunk.indices >= first) & (chunk.indices < last)
+                chunk_rows = np.repeat(np.arange(start, start + chunk.shape[0], dtype=np.int32), np.diff(chunk.indptr))
+                block_rows.append(chunk_rows[in_block])
+                block_terms.append(chunk.indices[in_block])
+                block_weights.append(chunk.data[in_block])
+            terms, weights = np.concatenate(block_terms), np.concatenate(block_weights)
+            block_rows = np.concatenate(block_rows)
+
+            # Group by term, heaviest weight first; ties keep the lower recipe id first
+            order = np.lexsort((block_rows, -weights, terms))
+            terms, block_rows = terms[order], block_rows[order]
+            if max_depth:
+                # Position of every entry inside its term's list
+                term_starts = np.concatenate([[0], np.cumsum(counts[first:last])])
+                ranks = np.arange(len(terms)) - term_starts[terms - first]
+                block_rows = block_rows[ranks < max_depth]
+            rows[offsets[first]:offsets[last]] = block_rows
+        return cls(offsets, rows, max_depth or 0)
+
+    @property
+    def n_terms(self):
+        return len(self.offsets) - 1
+
+    def candidates(self, input_vector, depth):
+        """Sorted ids of the recipes among the first depth entries of each query term's list."""
+        starts = self.offsets[input_vector.indices]
+        stops = np.minimum(self.offsets[input_vector.indices + 1], starts + depth)
+        if not len(starts):
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self.rows[start:stop] for start, stop in zip(starts, stops)])).astype(np.int64)
+
+    def nbytes(self):
+        return self.offsets.nbytes + self.rows.nbytes
+
+
+def save_ann_index(directory, index):
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "offsets.npy"), index.offsets)
+    np.save(os.path.join(directory, "rows.npy"), index.rows)
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({"n_terms": index.n_terms, "max_depth": index.max_depth}, f)
+
+
+def load_ann_index(directory, mmap=True):
+    """Opens an index written by save_ann_index, or returns None when there is none."""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    return ImpactIndex(
+        np.load(os.path.join(directory, "offsets.npy"), mmap_mode=mmap_mode),
+        np.load(os.path.join(directory, "rows.npy"), mmap_mode=mmap_mode),
+        meta["max_depth"],
+    )
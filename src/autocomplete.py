@@ -0,0 +1,172 @@
+import re
+import numpy as np
+from src.utils.preprocess import Preprocessor
+
+# Typos longer than this many letters may be two edits away, shorter ones only one
+LONG_WORD = 5
+MAX_DISTANCE = 2
+
+
+def edit_distance(a, b, limit=MAX_DISTANCE):
+    """Optimal string alignment distance (adjacent swaps count once), or limit + 1 once above limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # A shared start or end never costs an edit, so only the differing middle goes through the table
+    while a and b and a[0] == b[0]:
+        a, b = a[1:], b[1:]
+    while a and b and a[-1] == b[-1]:
+        a, b = a[:-1], b[:-1]
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return min(current[-1], limit + 1)
+
+
+def deletes(word, distance):
+    """Every string obtained from word by removing up to distance characters, word included."""
+    variants, frontier = {word}, {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class IngredientAutocomplete:
+    """
+    Suggests vectorizer terms for what a user is typing.
+
+    Prefix lookups are two binary searches over the sorted vocabulary followed by a partial
+    sort of the matching range by document frequency. Words that match nothing are corrected
+    against the single-word terms with a symmetric-delete index (built on first use): the
+    query's deletions are looked up among the terms' deletions, and only those candidates
+    get an edit distance computed.
+    """
+
+    def __init__(self, terms, doc_freq):
+        self.terms = terms
+        self.doc_freq = np.asarray(doc_freq)
+        self._delete_index = None
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, tfidf_matrix):
+        """Uses the stored sorted terms when the vectorizer has them; df comes from the matrix columns."""
+        terms = getattr(vectorizer.vocabulary_, "terms", None)
+        if terms is None:
+            terms = np.array([term.encode("utf-8") for term in vectorizer.get_feature_names_out()])
+        doc_freq = np.bincount(np.asarray(tfidf_matrix.indices), minlength=len(terms))
+        return cls(terms, doc_freq)
+
+    def term(self, position):
+        return self.terms[position].decode("utf-8")
+
+    def complete(self, prefix, limit=8):
+        """Terms starting with prefix (already normalized), most frequent first, as (term, df)."""
+        encoded = prefix.encode("utf-8")
+        if not encoded:
+            return []
+        width = self.terms.dtype.itemsize
+        lo = int(np.searchsorted(self.terms, np.array(encoded[:width], dtype=self.terms.dtype)))
+        if len(encoded) >= width:
+            # Only an exact match can start with a prefix as wide as the widest term
+            hits = [lo] if lo < len(self.terms) and self.terms[lo] == encoded else []
+            return [(self.term(p), int(self.doc_freq[p])) for p in hits]
+        hi = int(np.searchsorted(self.terms, np.array(encoded + b"\xff", dtype=self.terms.dtype)))
+        if hi <= lo:
+            return []
+
+        freq = self.doc_freq[lo:hi]
+        if hi - lo > limit:
+            best = np.argpartition(-freq, limit - 1)[:limit]
+        else:
+            best = np.arange(hi - lo)
+        best = best[np.lexsort((best, -freq[best]))]
+        return [(self.term(lo + i), int(freq[i])) for i in best]
+
+    def _build_delete_index(self):
+        index = {}
+        for position, encoded in enumerate(self.terms):
+            term = encoded.decode("utf-8")
+            if " " in term:
+                continue
+            for variant in deletes(term, MAX_DISTANCE if len(term) >= LONG_WORD else 1):
+                index.setdefault(variant, []).append(position)
+        self._delete_index = index
+
+    def correct(self, word, limit=3):
+        """Single-word terms within edit distance of word, closest then most frequent, as (term, distance, df)."""
+        if self._delete_index is None:
+            self._build_delete_index()
+        max_distance = MAX_DISTANCE if len(word) >= LONG_WORD else 1
+        candidates = set()
+        for variant in deletes(word, max_distance):
+            candidates.update(self._delete_index.get(variant, ()))
+
+        matches = []
+        for position in candidates:
+            distance = edit_distance(word, self.term(position), max_distance)
+            if distance <= max_distance:
+                matches.append((self.term(position), distance, int(self.doc_freq[position])))
+        return sorted(matches, key=lambda match: (match[1], -match[2]))[:limit]
+
+    @staticmethod
+    def normalize(text):
+        """
+        Cleans the finished words with Preprocessor and keeps the word still being typed as a
+        lowercase letters-only prefix, since lemmatising a partial word can change its start.
+        """
+        text = text.lower()
+        words = text.split()
+        if not words:
+            return ""
+        finished, typing = (words, "") if text[-1].isspace() else (words[:-1], words[-1])
+        cleaned = Preprocessor.clean_text(" ".join(finished)) if finished else ""
+        typing = re.sub(r"[^a-z]", "", typing)
+        return " ".join(part for part in (cleaned, typing) if part)
+
+    def suggest(self, text, limit=8):
+        """
+        Index terms for partially typed text: prefix matches first, then prefix matches of the
+        fully cleaned text (so "tomatoes" finds "tomato"), then spelling corrections.
+        """
+        for query in dict.fromkeys([self.normalize(text), Preprocessor.clean_text(text)]):
+            completions = self.complete(query, limit)
+            if completions:
+                return [term for term, _ in completions]
+
+        words = Preprocessor.clean_text(text).split() or self.normalize(text).split()
+        if not words:
+            return []
+        corrected = []
+        for word in words:
+            if word in self:
+                corrected.append(word)
+                continue
+            matches = self.correct(word, limit=1)
+            if not matches:
+                return []
+            corrected.append(matches[0][0])
+        completions = self.complete(" ".join(corrected), limit)
+        if completions:
+            return [term for term, _ in completions]
+        return [term for term, _, _ in self.correct(words[-1], limit)]
+
+    def unknown_words(self, ingredient):
+        """Words of a finished ingredient that survive cleaning but are not index terms."""
+        return [word for word in Preprocessor.clean_text(ingredient).split() if word not in self]
+
+    def __contains__(self, term):
+        return self._position(term) is not None
+
+    def _position(self, term):
+        encoded = term.encode("utf-8")
+        if not encoded or len(encoded) > self.terms.dtype.itemsize:
+            return None
+        position = int(np.searchsorted(self.terms, np.array(encoded, dtype=self.terms.dtype)))
+        return position if position < len(self.terms) and self.terms[position] == encoded else None
@@ -0,0 +1,116 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+from src.utils.preprocess import Preprocessor
+from src.utils import metrics
+
+MODEL_DIR = "src/models/"
+COMPACT_MODEL_FILE = "calorie_compact.pkl"
+FOREST_FILES = {
+    "regressor": "calories_regressor.pkl",
+    "vectorizer": "tfidf_vectorizer_calories.pkl",
+    "scaler": "calorie_scaler.pkl",
+    "was_log_transformed": "was_log_transformed.pkl",
+    "classifier": "calorie_classifier.pkl",
+}
+
+
+def classify_calories(calories):
+    """Low below 400 calories, Medium up to 800, High above."""
+    calories = np.asarray(calories, dtype=np.float64)
+    return np.where(calories < 400, "Low", np.where(calories <= 800, "Medium", "High"))
+
+
+class CaloriePredictor:
+    """
+    Predicts calories per serving and a Low/Medium/High class from ingredient lists.
+
+    Each batch is cleaned and vectorised once; the regressor and the classifier share that
+    matrix. The regressor sees it through the scaler when one was fitted.
+    """
+
+    def __init__(self, vectorizer, regressor, classifier, scaler=None, was_log_transformed=False):
+        self.vectorizer = vectorizer
+        self.regressor = regressor
+        self.classifier = classifier
+        self.scaler = scaler
+        self.was_log_transformed = was_log_transformed
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR, compact=False):
+        """Loads the compact serving model when asked for and available, otherwise the random forests."""
+        compact_path = os.path.join(model_dir, COMPACT_MODEL_FILE)
+        if compact and os.path.exists(compact_path):
+            with open(compact_path, "rb") as f:
+                return cls(**pickle.load(f))
+
+        assets = {}
+        for key, filename in FOREST_FILES.items():
+            with open(os.path.join(model_dir, filename), "rb") as f:
+                assets[key] = pickle.load(f)
+        return cls(**assets)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "vectorizer": self.vectorizer,
+                "regressor": self.regressor,
+                "classifier": self.classifier,
+                "scaler": self.scaler,
+                "was_log_transformed": self.was_log_transformed,
+            }, f)
+
+    @staticmethod
+    def clean(ingredient_lists):
+        return [" ".join(Preprocessor.clean_ingredients(ingredients)) for ingredients in ingredient_lists]
+
+    def predict_documents(self, documents):
+        """Predicts from already cleaned ingredient strings; returns (calories, classes) arrays."""
+        with metrics.timer("calories.transform"):
+            X = self.vectorizer.transform(documents)
+            X_regressor = self.scaler.transform(X) if self.scaler is not None else X
+
+        with metrics.timer("calories.regressor"):
+            calories = self.regressor.predict(X_regressor)
+            if self.was_log_transformed:
+                calories = np.expm1(calories)
+        with metrics.timer("calories.classifier"):
+            classes = self.classifier.predict(X)
+        return calories, classes
+
+    def predict_batch(self, ingredient_lists) -> pd.DataFrame:
+        """
+        One row per ingredient list, with calories and calorie_class. Lists with no valid
+        ingredient after cleaning get NaN and None.
+        """
+        metrics.count("calories.predictions", len(ingredient_lists))
+        with metrics.timer("calories.clean"):
+            documents = self.clean(ingredient_lists)
+        valid = np.array([bool(document) for document in documents], dtype=bool)
+        results = pd.DataFrame({
+            "calories": np.full(len(documents), np.nan),
+            "calorie_class": np.full(len(documents), None, dtype=object),
+        })
+        if valid.any():
+            calories, classes = self.predict_documents([doc for doc, ok in zip(documents, valid) if ok])
+            results.loc[valid, "calories"] = calories
+            results.loc[valid, "calorie_class"] = classes
+        return results
+
+    def predict(self, ingredients):
+        row = self.predict_batch([ingredients]).iloc[0]
+        return row["calories"], row["calorie_class"]
+
+
+def fit_compact_model(vectorizer, X_train, y_train, was_log_transformed, alpha=1.0, C=10.0):
+    """
+    Sparse linear serving model on the forest's features: ridge regression on the same
+    (log) target and a multinomial logistic classifier. Both are a few coefficient vectors.
+    """
+    from sklearn.linear_model import LogisticRegression, Ridge
+
+    calories = np.expm1(y_train) if was_log_transformed else y_train
+    regressor = Ridge(alpha=alpha).fit(X_train, y_train)
+    classifier = LogisticRegression(C=C, max_iter=2000).fit(X_train, classify_calories(calories))
+    return CaloriePredictor(vectorizer, regressor, classifier, scaler=None, was_log_transformed=was_log_transformed)
@@ -1,54 +1,144 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import time
 import pickle
 import warnings
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import train_test_split, HalvingRandomSearchCV
 from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
 from sklearn.metrics import mean_absolute_error, r2_score, classification_report
 from sklearn.preprocessing import StandardScaler
 from scipy.stats import randint
 
+from src.calorie_predictor import COMPACT_MODEL_FILE, classify_calories, fit_compact_model
+from src.index_store import index_exists, open_index
+from src.utils.memory import PeakTracker
+
 warnings.filterwarnings("ignore")
 
+FEATURE_SOURCES = ("own", "index")
+
 class CaloriesRegression:
     def __init__(self):
         load_dotenv()
         self.data_path = os.getenv("OUTPUT_PATH", "../data/processed/recipes_clean.csv")
         self.model_dir = "src/models/"
-        
+        # "index" reuses the TF-IDF features RecipeVectorizer stored in INDEX_DIR instead of fitting new ones
+        self.feature_source = os.getenv("CALORIE_FEATURES", "own")
+        self.feature_cache_dir = os.getenv("CALORIE_FEATURES_CACHE", "data/processed/calorie_features")
+        self.index_dir = os.getenv("INDEX_DIR")
+        if self.feature_source not in FEATURE_SOURCES:
+            raise ValueError(f"Unknown CALORIE_FEATURES {self.feature_source!r}; expected one of {FEATURE_SOURCES}.")
+
         self.vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=4, max_df=0.8)
         self.scaler = StandardScaler(with_mean=False)
         self.regressor = None
         self.classifier = None
         self.was_log_transformed = False
-        
+
         self.df = None
+        self.X = None
+        self.X_train = None
+        self.X_test = None
         self.X_train_scaled = None
         self.X_test_scaled = None
         self.y_train = None
         self.y_test = None
+        self.class_test_rows = None
+        self.stage_report = []
+        self.peaks = PeakTracker()
+
+    @contextmanager
+    def stage(self, name):
+        """Records wall time and peak RSS growth of one pipeline stage (main process only)."""
+        self.peaks.enter()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stage_report.append({"stage": name, "seconds": seconds, "peak_mib": self.peaks.exit()})
+
+    def _feature_key(self):
+        # The cache is valid as long as the data file and the feature source are unchanged
+        stat = os.stat(self.data_path)
+        key = {"data_path": os.path.abspath(self.data_path), "size": stat.st_size, "mtime": stat.st_mtime,
+               "source": self.feature_source, "vectorizer": repr(self.vectorizer)}
+        if self.feature_source == "index":
+            with open(os.path.join(self.index_dir, "manifest.json")) as f:
+                key["index_build_id"] = json.load(f)["build_id"]
+        return key
+
+    def _load_cached_features(self, key):
+        meta_path = os.path.join(self.feature_cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            if json.load(f) != key:
+                return None
+        with open(os.path.join(self.feature_cache_dir, "vectorizer.pkl"), "rb") as f:
+            vectorizer = pickle.load(f)
+        return vectorizer, sparse.load_npz(os.path.join(self.feature_cache_dir, "features.npz"))
+
+    def _save_cached_features(self, key):
+        os.makedirs(self.feature_cache_dir, exist_ok=True)
+        # meta.json is written last, so an interrupted write is never mistaken for a valid cache
+        meta_path = os.path.join(self.feature_cache_dir, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        sparse.save_npz(os.path.join(self.feature_cache_dir, "features.npz"), self.X, compressed=False)
+        with open(os.path.join(self.feature_cache_dir, "vectorizer.pkl"), "wb") as f:
+            pickle.dump(self.vectorizer, f)
+        with open(meta_path, "w") as f:
+            json.dump(key, f)
+
+    def _index_features(self):
+        if not index_exists(self.index_dir):
+            raise ValueError(f"CALORIE_FEATURES=index but there is no index at {self.index_dir}.")
+        index = open_index(self.index_dir, mmap=False)
+        titles = index["recipes"].column("title")
+        if len(titles) != len(self.df) or list(titles) != self.df['title'].tolist():
+            raise ValueError(f"Index at {self.index_dir} does not match {self.data_path}; rebuild it with RecipeVectorizer.")
+        return index["vectorizer"], index["tfidf_matrix"].tocsr()
+
+    def featurize(self):
+        """TF-IDF features for every recipe, computed once and cached on disk next to the data."""
+        key = self._feature_key()
+        cached = self._load_cached_features(key)
+        if cached is not None:
+            self.vectorizer, self.X = cached
+            print(f"Loaded cached features from {self.feature_cache_dir}")
+            return
+
+        if self.feature_source == "index":
+            self.vectorizer, self.X = self._index_features()
+        else:
+            self.X = self.vectorizer.fit_transform(self.df['ingredients_cleaned'].fillna(''))
+        self._save_cached_features(key)
 
     def load_and_prepare_data(self):
         self.df = pd.read_csv(self.data_path)
         y = self.df['calories']
-        
+
         # Log transformation logic
         self.was_log_transformed = np.abs(y.skew()) > 1
         y_processed = np.log1p(y) if self.was_log_transformed else y.copy()
-            
-        # Fitting the calorie_vectorizer
-        X_tfidf = self.calorie_vectorizer.fit_transform(self.df['ingredients_cleaned'])
-        
-        X_train, X_test, self.y_train, self.y_test = train_test_split(
-            X_tfidf, y_processed, test_size=0.2, random_state=42
+
+        self.featurize()
+
+        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+            self.X, y_processed, test_size=0.2, random_state=42
         )
-        
-        self.X_train_scaled = self.scaler.fit_transform(X_train)
-        self.X_test_scaled = self.scaler.transform(X_test)
+
+        self.X_train_scaled = self.scaler.fit_transform(self.X_train)
+        self.X_test_scaled = self.scaler.transform(self.X_test)
 
     def train_regressor(self):
         param_dist = {
@@ -56,30 +146,45 @@ class CaloriesRegression:
             'max_depth': [None, 10, 20],
             'min_samples_split': randint(2, 10)
         }
-        search = RandomizedSearchCV(
+        # Successive halving: every candidate starts on a small sample of the training rows and
+        # only the best third moves on to three times as many, up to the full training set
+        search = HalvingRandomSearchCV(
             RandomForestRegressor(random_state=42),
             param_distributions=param_dist,
-            n_iter=20, cv=5, scoring='neg_mean_absolute_error', n_jobs=-1, random_state=42
+            n_candidates=20, factor=3, min_resources='exhaust', cv=5,
+            scoring='neg_mean_absolute_error', n_jobs=-1, random_state=42
         )
         search.fit(self.X_train_scaled, self.y_train)
         self.regressor = search.best_estimator_
+        print(f"Best regressor parameters: {search.best_params_}")
 
     def train_classifier(self):
-        def classify(cps):
-            if cps < 400: return 'Low'
-            elif cps <= 800: return 'Medium'
-            else: return 'High'
-
-        self.df['calorie_class'] = self.df['calories'].apply(classify)
-        X_class = self.calorie_vectorizer.transform(self.df['ingredients_cleaned'])
+        self.df['calorie_class'] = classify_calories(self.df['calories'])
         y_class = self.df['calorie_class']
 
-        X_train_c, X_test_c, y_train_c, y_test_c = train_test_split(
-            X_class, y_class, test_size=0.2, random_state=42, stratify=y_class
+        # Same feature matrix as the regressor, split by row so the classes stay stratified
+        train_rows, test_rows = train_test_split(
+            np.arange(len(self.df)), test_size=0.2, random_state=42, stratify=y_class
         )
-
         self.classifier = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
-        self.classifier.fit(X_train_c, y_train_c)
+        self.classifier.fit(self.X[train_rows], y_class.iloc[train_rows])
+        self.class_test_rows = test_rows
+
+    def evaluate(self):
+        predicted = self.regressor.predict(self.X_test_scaled)
+        y_true = self.y_test
+        if self.was_log_transformed:
+            predicted, y_true = np.expm1(predicted), np.expm1(y_true)
+        print(f"Regressor MAE: {mean_absolute_error(y_true, predicted):.1f}, R2: {r2_score(y_true, predicted):.3f}")
+
+        y_class = self.df['calorie_class'].iloc[self.class_test_rows]
+        print(classification_report(y_class, self.classifier.predict(self.X[self.class_test_rows])))
+
+    def train_compact_model(self):
+        """Fits the sparse linear serving model on the same features and saves it as calorie_compact.pkl."""
+        compact = fit_compact_model(self.vectorizer, self.X_train, self.y_train, self.was_log_transformed)
+        os.makedirs(self.model_dir, exist_ok=True)
+        compact.save(os.path.join(self.model_dir, COMPACT_MODEL_FILE))
 
     def save_models(self):
         os.makedirs(self.model_dir, exist_ok=True)
@@ -95,11 +200,22 @@ class CaloriesRegression:
                 pickle.dump(obj, f)
 
     def run_full_pipeline(self):
-        self.load_and_prepare_data()
-        self.train_regressor()
-        self.train_classifier()
+        with self.stage("featurize"):
+            self.load_and_prepare_data()
+        with self.stage("train_regressor"):
+            self.train_regressor()
+        with self.stage("train_classifier"):
+            self.train_classifier()
+        with self.stage("train_compact_model"):
+            self.train_compact_model()
+        self.evaluate()
         self.save_models()
 
+        print(f"{'stage':>20} {'seconds':>9} {'peak MiB':>9}")
+        for row in self.stage_report:
+            peak = "-" if row["peak_mib"] is None else f"{row['peak_mib']:.1f}"
+            print(f"{row['stage']:>20} {row['seconds']:>9.1f} {peak:>9}")
+
 if __name__ == "__main__":
     trainer = CaloriesRegression()
-    trainer.run_full_pipeline()
\ No newline at end of file
+    trainer.run_full_pipeline()
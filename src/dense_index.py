@@ -0,0 +1,125 @@
+import json
+import os
+import numpy as np
+
+META_FILE = "meta.json"
+DENSE_DTYPES = ("float32", "int8")
+# The projection only needs a sample of the rows to span the useful directions
+SVD_SAMPLE = 50_000
+EMBED_CHUNK = 16_384
+
+
+def fit_projection(tfidf_matrix, n_components, sample_size=SVD_SAMPLE, seed=0):
+    """Learns a (n_terms, n_components) TruncatedSVD projection from a sample of the rows."""
+    # Only index builds fit a projection; serving never pays for importing sklearn
+    from sklearn.decomposition import TruncatedSVD
+
+    n_rows = tfidf_matrix.shape[0]
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(n_rows, sample_size, replace=False)) if n_rows > sample_size else np.arange(n_rows)
+    sample = tfidf_matrix[rows]
+    n_components = max(1, min(n_components, min(sample.shape) - 1))
+    svd = TruncatedSVD(n_components=n_components, algorithm="randomized", random_state=seed).fit(sample)
+    return np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+
+def embed(matrix, projection):
+    """L2-normalised float32 embeddings of sparse TF-IDF rows, so dot products are cosines."""
+    # Casting the sparse side keeps scipy from upcasting the whole projection on every call
+    embeddings = np.asarray(matrix.astype(np.float32) @ projection)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1)
+
+
+def quantize(embeddings):
+    """Symmetric per-row int8 quantisation; returns the codes and the float32 scale of each row."""
+    scales = np.abs(embeddings).max(axis=1) / 127
+    scales[scales == 0] = 1
+    codes = np.rint(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class DenseEmbeddings:
+    """
+    Low-rank dense view of the TF-IDF matrix: recipes are projected onto a TruncatedSVD basis
+    and stored as unit float32 rows, or as int8 codes with one scale per row. Scoring a query
+    is one dense matvec over n_recipes x n_components values instead of a sparse product over
+    the vocabulary.
+    """
+
+    def __init__(self, projection, embeddings, scales=None):
+        self.projection = projection
+        self.embeddings = embeddings
+        self.scales = scales
+
+    @property
+    def dtype(self):
+        return str(self.embeddings.dtype)
+
+    @classmethod
+    def build(cls, tfidf_matrix, n_components=128, dtype="float32", seed=0):
+        if dtype not in DENSE_DTYPES:
+            raise ValueError(f"Unknown embedding dtype {dtype!r}; expected one of {DENSE_DTYPES}.")
+        projection = fit_projection(tfidf_matrix, n_components, seed=seed)
+        embeddings = embed(tfidf_matrix, projection)
+        if dtype == "int8":
+            return cls(projection, *quantize(embeddings))
+        return cls(projection, embeddings)
+
+    def embed(self, matrix):
+        return embed(matrix, self.projection)
+
+    def score(self, query_embeddings, rows=None):
+        """Cosine scores of (n_queries, n_components) embeddings against the stored rows."""
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        if self.scales is None:
+            return embeddings @ query_embeddings.T
+
+        # int8 codes are widened one chunk at a time, so the float copy stays small
+        scores = np.empty((len(embeddings), len(query_embeddings)), dtype=np.float32)
+        for start in range(0, len(embeddings), EMBED_CHUNK):
+            stop = min(start + EMBED_CHUNK, len(embeddings))
+            scores[start:stop] = embeddings[start:stop].astype(np.float32) @ query_embeddings.T
+        scales = self.scales if rows is None else self.scales[rows]
+        return scores * scales[:, None]
+
+    def nbytes(self):
+        scales = self.scales.nbytes if self.scales is not None else 0
+        return self.projection.nbytes + self.embeddings.nbytes + scales
+
+
+def write_dense_embeddings(directory, tfidf_matrix, n_components=128, dtype="float32"):
+    """Fits the projection and writes the embeddings chunk by chunk, never holding them all in memory."""
+    if dtype not in DENSE_DTYPES:
+        raise ValueError(f"Unknown embedding dtype {dtype!r}; expected one of {DENSE_DTYPES}.")
+    os.makedirs(directory, exist_ok=True)
+    projection = fit_projection(tfidf_matrix, n_components)
+    np.save(os.path.join(directory, "projection.npy"), projection)
+
+    n_rows = tfidf_matrix.shape[0]
+    shape = (n_rows, projection.shape[1])
+    embeddings = np.lib.format.open_memmap(os.path.join(directory, "embeddings.npy"), mode="w+", dtype=dtype, shape=shape)
+    scales = np.ones(n_rows, dtype=np.float32)
+    for start in range(0, n_rows, EMBED_CHUNK):
+        stop = min(start + EMBED_CHUNK, n_rows)
+        chunk = embed(tfidf_matrix[start:stop], projection)
+        if dtype == "int8":
+            chunk, scales[start:stop] = quantize(chunk)
+        embeddings[start:stop] = chunk
+    embeddings.flush()
+    if dtype == "int8":
+        np.save(os.path.join(directory, "scales.npy"), scales)
+
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({"dtype": dtype, "n_components": projection.shape[1]}, f)
+
+
+def load_dense_embeddings(directory, mmap=True):
+    """Opens embeddings written by write_dense_embeddings, or returns None when there are none."""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    load = lambda name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+    return DenseEmbeddings(load("projection"), load("embeddings"), load("scales") if meta["dtype"] == "int8" else None)
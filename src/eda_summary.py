@@ -0,0 +1,161 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from collections import Counter
+
+EDA_SUMMARY_FILE = "eda_summary.json"
+
+MEAT = ["chicken", "beef", "pork", "lamb", "bacon", "turkey"]
+HIGH_CAL = ["oil", "butter", "olive"]
+DIFFICULTY_LEVELS = ["Easy", "Medium", "Hard"]
+
+CALORIE_BINS = 40
+KDE_GRIDSIZE = 200
+TOP_INGREDIENTS = 20
+# Distinct calorie values evaluated at once by the density curve
+KDE_BLOCK = 4096
+
+
+def add_eda_features(df):
+    """Adds the derived columns used by the Descriptive_stats page, with vectorised string ops."""
+    df = df.copy()
+    ingredients = df["ingredients"].fillna("").astype(str)
+    instructions = df["instructions"].fillna("")
+
+    df["num_ingredients"] = ingredients.str.split().str.len()
+    df["calories_per_ingredient"] = df["calories"] / df["num_ingredients"].replace(0, np.nan)
+
+    # Instructions are usually a stringified list; a real list counts its items
+    is_list = instructions.map(lambda value: isinstance(value, list))
+    num_steps = instructions.astype(str).str.count(r"\.")
+    num_steps[is_list] = instructions[is_list].map(len)
+    df["num_steps"] = num_steps.astype(np.int64)
+    df["difficulty"] = pd.cut(df["num_steps"], [-np.inf, 5, 10, np.inf], labels=DIFFICULTY_LEVELS).astype(str)
+
+    # One regex pass per flag instead of one substring scan per keyword
+    df["is_vegetarian"] = ~ingredients.str.contains("|".join(MEAT), regex=True)
+    df["has_oil_butter"] = ingredients.str.contains("|".join(HIGH_CAL), regex=True)
+    return df
+
+
+def _sorted_counts(counter):
+    values = np.array(sorted(counter))
+    return values, np.array([counter[value] for value in values], dtype=np.int64)
+
+
+def _quantile(values, counts, q):
+    """np.quantile (linear method) of the sample holding counts[i] copies of values[i]."""
+    position = q * (counts.sum() - 1)
+    below = int(np.floor(position))
+    cumulative = np.cumsum(counts)
+    lower, upper = values[np.searchsorted(cumulative, [below, min(below + 1, cumulative[-1] - 1)], side="right")]
+    return float(np.quantile([lower, upper], position - below))
+
+
+def _box_stats(counters, labels):
+    """The statistics matplotlib's boxplot_stats gives (whis=1.5), read off value counts per label."""
+    stats = []
+    for label in labels:
+        if not counters[label]:
+            continue
+        values, counts = _sorted_counts(counters[label])
+        q1, med, q3 = (_quantile(values, counts, q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        whislo = float(inside.min()) if len(inside) and inside.min() <= q1 else q1
+        whishi = float(inside.max()) if len(inside) and inside.max() >= q3 else q3
+        stats.append({
+            "label": str(label),
+            "med": med,
+            "q1": q1,
+            "q3": q3,
+            "whislo": whislo,
+            "whishi": whishi,
+            # Duplicated outliers draw the same marker, so only distinct values are kept
+            "fliers": values[(values < whislo) | (values > whishi)].tolist(),
+        })
+    return stats
+
+
+def _calories_histogram(values, counts):
+    counts_per_bin, edges = np.histogram(values, bins=CALORIE_BINS, weights=counts)
+    n = counts.sum()
+    # Same density curve seaborn's histplot(kde=True) draws: a Gaussian KDE with Scott
+    # bandwidth and no cut, scaled from density to counts per bin
+    kde_x = np.linspace(values.min(), values.max(), KDE_GRIDSIZE)
+    kde_y = np.zeros_like(kde_x)
+    if np.ptp(values):
+        mean = np.average(values, weights=counts)
+        bandwidth = np.sqrt(np.sum(counts * (values - mean) ** 2) / (n - 1)) * n ** -0.2
+        for start in range(0, len(values), KDE_BLOCK):
+            block, weights = values[start:start + KDE_BLOCK], counts[start:start + KDE_BLOCK]
+            z = (kde_x[:, None] - block[None, :]) / bandwidth
+            kde_y += np.exp(-0.5 * z ** 2) @ weights
+        kde_y *= (edges[1] - edges[0]) / (bandwidth * np.sqrt(2 * np.pi))
+    return {
+        "edges": edges.tolist(),
+        "counts": np.rint(counts_per_bin).astype(np.int64).tolist(),
+        "kde_x": kde_x.tolist(),
+        "kde_y": kde_y.tolist(),
+    }
+
+
+class EDASummaryBuilder:
+    """
+    Accumulates the Descriptive_stats aggregates chunk by chunk during the offline build.
+
+    Calories, rounded to the nearest calorie, and step counts are kept as counts per distinct
+    value and group, so memory depends on the calorie range and the vocabulary, not on the
+    number of recipes, and the streaming pipeline can build the summary too. Quartiles,
+    whiskers, fliers, the histogram and the density curve are computed from those counts.
+    """
+
+    def __init__(self):
+        self.n_recipes = 0
+        self.steps = {level: Counter() for level in DIFFICULTY_LEVELS}
+        self.calories = {flag: {False: Counter(), True: Counter()} for flag in ("has_oil_butter", "is_vegetarian")}
+        self.ingredient_counts = Counter()
+
+    def add(self, chunk):
+        self.n_recipes += len(chunk)
+        _count_values(self.steps, chunk["difficulty"].astype(str), chunk["num_steps"])
+        calories = pd.to_numeric(chunk["calories"], errors="coerce").round()
+        for flag, counters in self.calories.items():
+            _count_values(counters, chunk[flag].astype(bool), calories)
+        self.ingredient_counts.update(chunk["ingredients_cleaned"].fillna("").str.split().explode().dropna().value_counts().to_dict())
+
+    def summary(self):
+        # Every recipe with known calories is in exactly one of the two oil/butter groups
+        values, counts = _sorted_counts(self.calories["has_oil_butter"][False] + self.calories["has_oil_butter"][True])
+        return {
+            "n_recipes": self.n_recipes,
+            "calories_histogram": _calories_histogram(values, counts),
+            "steps_by_difficulty": _box_stats(self.steps, DIFFICULTY_LEVELS),
+            "calories_by_oil_butter": _box_stats(self.calories["has_oil_butter"], [False, True]),
+            "calories_by_vegetarian": _box_stats(self.calories["is_vegetarian"], [False, True]),
+            "top_ingredients": self.ingredient_counts.most_common(TOP_INGREDIENTS),
+        }
+
+
+def _count_values(counters, groups, values):
+    """Adds the occurrences of every (group, value) pair to counters[group]; missing values are skipped."""
+    pairs = pd.DataFrame({"group": groups.to_numpy(), "value": values.to_numpy()}).dropna()
+    for (group, value), count in pairs.value_counts().items():
+        if group in counters:
+            counters[group][value] += int(count)
+
+
+def build_eda_summary(df):
+    builder = EDASummaryBuilder()
+    builder.add(df if "difficulty" in df else add_eda_features(df))
+    return builder.summary()
+
+
+def load_eda_summary(index_dir):
+    """Returns the summary stored with the index, or None for indexes built without one."""
+    path = os.path.join(index_dir, EDA_SUMMARY_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
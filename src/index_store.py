@@ -0,0 +1,414 @@
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from src.sparse_store import SparseMatrixWriter, bin_to_npy, load_sparse_matrix, save_sparse_matrix
+
+# Bump whenever the layout below changes; readers refuse other versions.
+#
+#   manifest.json                 format version, build id, sizes, vectorizer settings
+#   tfidf/, neighbors/            CSR matrices (see sparse_store)
+#   vocabulary/terms.npy          sorted fixed-width UTF-8 terms, column order of tfidf
+#   vocabulary/idf.npy
+#   recipes/columns.json          column names and kinds
+#   recipes/<col>.npy             numeric columns
+#   recipes/<col>.offsets.npy     string columns: int64 offsets into <col>.bytes.npy
+#   recipes/<col>.bytes.npy
+INDEX_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+SUPPORTED_VECTORIZER_PARAMS = {
+    "analyzer": "word",
+    "input": "content",
+    "preprocessor": None,
+    "tokenizer": None,
+    "stop_words": None,
+    "strip_accents": None,
+    "use_idf": True,
+}
+
+
+def narrow_integers(values):
+    """values in the smallest signed integer type that holds them."""
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+
+def _to_text(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return str(value)
+
+
+class StringColumn:
+    """UTF-8 strings packed into one byte buffer; values are decoded only when read."""
+
+    def __init__(self, offsets, buffer):
+        self.offsets = offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [_to_text(value).encode("utf-8") for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return self.buffer[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+    def nbytes(self):
+        return self.offsets.nbytes + self.buffer.nbytes
+
+
+class RecipeColumns:
+    """Columnar recipe table: numeric columns as typed arrays, strings as StringColumn buffers."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        """Copies df, or only the given columns of it, into typed arrays and string buffers."""
+        names = [name for name in columns if name in df.columns] if columns is not None else df.columns
+        columns = {}
+        for name in names:
+            if pd.api.types.is_bool_dtype(df[name]):
+                columns[name] = df[name].to_numpy()
+            elif pd.api.types.is_integer_dtype(df[name]):
+                columns[name] = narrow_integers(df[name].to_numpy())
+            elif pd.api.types.is_numeric_dtype(df[name]):
+                columns[name] = df[name].to_numpy()
+            else:
+                columns[name] = StringColumn.from_values(df[name])
+        return cls(columns)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def numeric(self, name, dtype=np.float64):
+        return np.asarray(self.columns[name], dtype=dtype)
+
+    def column(self, name):
+        values = self.columns[name]
+        return values.take(range(len(values))) if isinstance(values, StringColumn) else list(values)
+
+    def take(self, rows, columns=None) -> pd.DataFrame:
+        """Decodes only the requested rows; the frame is indexed by recipe id."""
+        columns = [name for name in (columns or self.columns) if name in self.columns]
+        data = {}
+        for name in columns:
+            values = self.columns[name]
+            data[name] = values.take(rows) if isinstance(values, StringColumn) else np.asarray(values[rows])
+        return pd.DataFrame(data, index=pd.Index(rows))
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.take(np.arange(len(self)))
+
+    def nbytes(self):
+        return sum(values.nbytes() if isinstance(values, StringColumn) else values.nbytes for values in self.columns.values())
+
+
+class RecipeColumnsWriter:
+    """Appends DataFrame chunks to a recipes/ directory without holding the whole table."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.kinds = None
+        self.n_rows = 0
+        self._sizes = {}
+        self._files = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self, chunk):
+        self.kinds = {
+            name: "numeric" if pd.api.types.is_numeric_dtype(chunk[name]) else "string"
+            for name in chunk.columns
+        }
+        for name, kind in self.kinds.items():
+            if kind == "numeric":
+                self._files[name] = open(os.path.join(self.directory, f"{name}.bin"), "wb")
+            else:
+                self._files[name] = open(os.path.join(self.directory, f"{name}.bytes.bin"), "wb")
+                self._files[f"{name}.offsets"] = open(os.path.join(self.directory, f"{name}.offsets.bin"), "wb")
+                np.zeros(1, dtype=np.int64).tofile(self._files[f"{name}.offsets"])
+                self._sizes[name] = 0
+
+    def append(self, chunk):
+        if self.kinds is None:
+            self._open(chunk)
+        for name, kind in self.kinds.items():
+            if kind == "numeric":
+                chunk[name].to_numpy(dtype=np.float64).tofile(self._files[name])
+                continue
+            column = StringColumn.from_values(chunk[name])
+            column.buffer.tofile(self._files[name])
+            (column.offsets[1:] + self._sizes[name]).tofile(self._files[f"{name}.offsets"])
+            self._sizes[name] += len(column.buffer)
+        self.n_rows += len(chunk)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+        for name, kind in (self.kinds or {}).items():
+            if kind == "numeric":
+                # Integral columns such as calories go back to the narrowest integer type
+                values = np.fromfile(os.path.join(self.directory, f"{name}.bin"), dtype=np.float64)
+                os.remove(os.path.join(self.directory, f"{name}.bin"))
+                if np.all(np.isfinite(values)) and np.all(values == np.round(values)):
+                    values = narrow_integers(values)
+                np.save(os.path.join(self.directory, f"{name}.npy"), values)
+            else:
+                for part, dtype in (("bytes", np.uint8), ("offsets", np.int64)):
+                    bin_to_npy(
+                        os.path.join(self.directory, f"{name}.{part}.bin"),
+                        os.path.join(self.directory, f"{name}.{part}.npy"),
+                        dtype,
+                        dtype,
+                    )
+
+        with open(os.path.join(self.directory, "columns.json"), "w") as f:
+            json.dump({"n_rows": self.n_rows, "columns": self.kinds or {}}, f)
+
+
+def load_recipe_columns(directory, mmap=True, columns=None):
+    """Opens the stored columns, or only those of them listed in columns."""
+    with open(os.path.join(directory, "columns.json")) as f:
+        meta = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    kinds = meta["columns"]
+    names = [name for name in columns if name in kinds] if columns is not None else list(kinds)
+    columns = {}
+    for name in names:
+        if kinds[name] == "numeric":
+            columns[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        else:
+            columns[name] = StringColumn(
+                np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode=mmap_mode),
+                np.load(os.path.join(directory, f"{name}.bytes.npy"), mmap_mode=mmap_mode),
+            )
+    return RecipeColumns(columns)
+
+
+class CompactVocabulary:
+    """Read-only term -> column mapping backed by a sorted fixed-width byte array (binary search)."""
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def lookup(self, terms):
+        """Column ids of terms, -1 where a term is not in the vocabulary."""
+        encoded = [term.encode("utf-8") for term in terms]
+        if not encoded:
+            return np.empty(0, dtype=np.int64)
+        # Terms longer than the widest vocabulary entry would be truncated by the cast
+        fits = np.array([len(term) <= self.terms.dtype.itemsize for term in encoded])
+        candidates = np.array(encoded, dtype=self.terms.dtype)
+        positions = np.minimum(np.searchsorted(self.terms, candidates), len(self.terms) - 1)
+        found = fits & (self.terms[positions] == candidates)
+        return np.where(found, positions, -1)
+
+    def get(self, term, default=None):
+        position = int(self.lookup([term])[0])
+        return default if position < 0 else position
+
+    def __getitem__(self, term):
+        position = self.get(term)
+        if position is None:
+            raise KeyError(term)
+        return position
+
+    def __contains__(self, term):
+        return self.get(term) is not None
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class CompactVectorizer:
+    """
+    Query-time replacement for the fitted TfidfVectorizer: same analyzer, vocabulary and
+    weighting, but the vocabulary is a memory-mapped sorted array instead of a Python dict.
+    """
+
+    def __init__(self, terms, idf, params):
+        self.vocabulary_ = CompactVocabulary(terms)
+        self.idf_ = idf
+        self.params = params
+        self._token_pattern = re.compile(params["token_pattern"])
+
+    def build_analyzer(self):
+        return self.analyze
+
+    def analyze(self, doc):
+        if self.params["lowercase"]:
+            doc = doc.lower()
+        tokens = self._token_pattern.findall(doc)
+        min_n, max_n = self.params["ngram_range"]
+        # Same n-gram order as CountVectorizer._word_ngrams
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def transform(self, raw_documents):
+        indptr = [0]
+        indices, values = [], []
+        for doc in raw_documents:
+            ids = self.vocabulary_.lookup(self.analyze(doc))
+            ids, counts = np.unique(ids[ids >= 0], return_counts=True)
+            weights = counts.astype(np.float64)
+            if self.params["sublinear_tf"]:
+                weights = np.log(weights) + 1
+            weights *= self.idf_[ids]
+            if self.params["norm"] == "l2" and len(weights):
+                weights /= np.sqrt(np.dot(weights, weights))
+            elif self.params["norm"] == "l1" and len(weights):
+                weights /= np.abs(weights).sum()
+            indices.append(ids)
+            values.append(weights)
+            indptr.append(indptr[-1] + len(ids))
+
+        return csr_matrix(
+            (
+                np.concatenate(values) if values else np.empty(0),
+                np.concatenate(indices) if indices else np.empty(0, dtype=np.int64),
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(len(indptr) - 1, len(self.idf_)),
+        )
+
+
+def vectorizer_params(vectorizer):
+    """The TfidfVectorizer settings CompactVectorizer needs; anything else is rejected."""
+    params = vectorizer.get_params()
+    for name, value in SUPPORTED_VECTORIZER_PARAMS.items():
+        if params[name] != value:
+            raise ValueError(f"Index format does not support TfidfVectorizer({name}={params[name]!r})")
+    return {
+        "lowercase": params["lowercase"],
+        "token_pattern": params["token_pattern"],
+        "ngram_range": list(params["ngram_range"]),
+        "norm": params["norm"],
+        "sublinear_tf": params["sublinear_tf"],
+    }
+
+
+class IndexWriter:
+    """Builds an index in a temporary directory and swaps it into place on commit()."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tmp_dir = f"{directory}.tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+        self.manifest = {}
+
+    def path(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def write_vectorizer(self, vectorizer):
+        # get_feature_names_out lists terms in column order, which sklearn keeps sorted
+        encoded = np.array([term.encode("utf-8") for term in vectorizer.get_feature_names_out()])
+        if np.any(encoded[1:] < encoded[:-1]):
+            raise ValueError("Vocabulary columns must be in sorted term order.")
+
+        os.makedirs(self.path("vocabulary"))
+        np.save(os.path.join(self.path("vocabulary"), "terms.npy"), encoded)
+        np.save(os.path.join(self.path("vocabulary"), "idf.npy"), np.asarray(vectorizer.idf_, dtype=np.float64))
+        self.manifest["vectorizer"] = vectorizer_params(vectorizer)
+        self.manifest["n_terms"] = len(encoded)
+
+    def write_matrix(self, name, matrix):
+        save_sparse_matrix(self.path(name), matrix)
+
+    def matrix_writer(self, name, n_cols):
+        return SparseMatrixWriter(self.path(name), n_cols)
+
+    def write_recipes(self, df):
+        writer = self.recipes_writer()
+        writer.append(df)
+        writer.close()
+
+    def recipes_writer(self):
+        return RecipeColumnsWriter(self.path("recipes"))
+
+    def write_json(self, name, payload):
+        with open(self.path(name), "w") as f:
+            json.dump(payload, f)
+
+    def commit(self, n_recipes):
+        self.manifest.update({
+            "format_version": INDEX_FORMAT_VERSION,
+            "build_id": uuid.uuid4().hex,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "n_recipes": n_recipes,
+        })
+        with open(self.path(MANIFEST_FILE), "w") as f:
+            json.dump(self.manifest, f, indent=2)
+
+        # Readers that already opened the old index keep their mapped files;
+        # new readers only ever see a complete directory.
+        old_dir = f"{self.directory}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.directory):
+            os.replace(self.directory, old_dir)
+        os.replace(self.tmp_dir, self.directory)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def index_exists(directory):
+    return bool(directory) and os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != INDEX_FORMAT_VERSION:
+        raise ValueError(
+            f"Index at {directory} has format version {manifest.get('format_version')}, "
+            f"expected {INDEX_FORMAT_VERSION}. Rebuild it with RecipeVectorizer."
+        )
+    return manifest
+
+
+def open_index(directory, mmap=True, recipe_columns=None):
+    """
+    Opens every part of an index; with mmap=True nothing is read until it is used.
+    recipe_columns restricts the recipe table to the columns the caller reads.
+    """
+    manifest = read_manifest(directory)
+    mmap_mode = "r" if mmap else None
+    vocabulary_dir = os.path.join(directory, "vocabulary")
+    neighbors_dir = os.path.join(directory, "neighbors")
+    return {
+        "manifest": manifest,
+        "vectorizer": CompactVectorizer(
+            np.load(os.path.join(vocabulary_dir, "terms.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(vocabulary_dir, "idf.npy"), mmap_mode=mmap_mode),
+            manifest["vectorizer"],
+        ),
+        "tfidf_matrix": load_sparse_matrix(os.path.join(directory, "tfidf"), mmap=mmap),
+        "neighbor_index": load_sparse_matrix(neighbors_dir, mmap=mmap) if os.path.isdir(neighbors_dir) else None,
+        "recipes": load_recipe_columns(os.path.join(directory, "recipes"), mmap=mmap, columns=recipe_columns),
+    }
@@ -0,0 +1,269 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from src.index_store import CompactVocabulary
+
+META_FILE = "meta.json"
+ARRAYS = (
+    "terms", "token_counts", "doc_freq", "order",
+    "cooc_indptr", "cooc_indices", "cooc_counts",
+    "calorie_count", "calorie_mean", "calorie_median",
+)
+# Partners kept per ingredient in the co-occurrence matrix; 0 keeps them all
+COOC_TOP_K = 100
+# Co-occurrence rows ordered and cut at once by build()
+COOC_BLOCK_ROWS = 256
+
+
+class IngredientStats:
+    """
+    Precomputed statistics over the ingredients_cleaned tokens of the catalog.
+
+    token_counts counts every occurrence and doc_freq the recipes using a token; order lists
+    the tokens by token_counts, so top(n) only reads n entries. The co-occurrence matrix is
+    the binary recipe x token matrix multiplied by its transpose (diagonal dropped), with each
+    row stored in decreasing count order and cut to its top_k partners, so goes_with() reads
+    a prefix of one row. Every token also has the count, mean and median of the calories of
+    the recipes using it.
+    """
+
+    def __init__(self, terms, token_counts, doc_freq, order, cooc_indptr, cooc_indices, cooc_counts,
+                 calorie_count, calorie_mean, calorie_median, n_docs):
+        self.terms = terms
+        self.vocabulary = CompactVocabulary(terms)
+        self.token_counts = token_counts
+        self.doc_freq = doc_freq
+        self.order = order
+        self.cooc_indptr = cooc_indptr
+        self.cooc_indices = cooc_indices
+        self.cooc_counts = cooc_counts
+        self.calorie_count = calorie_count
+        self.calorie_mean = calorie_mean
+        self.calorie_median = calorie_median
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_documents(cls, documents, calories=None, top_k=COOC_TOP_K):
+        builder = IngredientStatsBuilder()
+        builder.add(documents, calories)
+        return builder.build(top_k)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return self._position(term) is not None
+
+    def _position(self, term):
+        return self.vocabulary.get(term) if len(self.terms) else None
+
+    def term(self, position):
+        return self.terms[position].decode("utf-8")
+
+    def top(self, n=20):
+        """The n most frequent tokens as (token, occurrences) pairs."""
+        return [(self.term(position), int(self.token_counts[position])) for position in self.order[:n]]
+
+    def goes_with(self, term, top_n=10, measure="count"):
+        """
+        Tokens most often found in the same recipes as term, as (token, recipes together, lift)
+        tuples. measure="lift" ranks the stored partners by how much more often they appear
+        with term than on average, which favours specific pairings over staples like salt.
+        """
+        position = self._position(term)
+        if position is None:
+            return []
+        start, stop = self.cooc_indptr[position], self.cooc_indptr[position + 1]
+        partners = np.asarray(self.cooc_indices[start:stop])
+        counts = np.asarray(self.cooc_counts[start:stop])
+        lift = counts * self.n_docs / (self.doc_freq[position] * self.doc_freq[partners].astype(np.float64))
+        if measure == "lift":
+            ranked = np.argsort(-lift, kind="stable")[:top_n]
+        elif measure == "count":
+            ranked = np.arange(min(top_n, len(partners)))
+        else:
+            raise ValueError(f"Unknown measure {measure!r}; expected 'count' or 'lift'.")
+        return [(self.term(partners[i]), int(counts[i]), float(lift[i])) for i in ranked]
+
+    def suggest(self, pantry, top_n=10):
+        """Tokens that most often accompany the whole pantry, excluding what it already holds."""
+        positions = [p for p in (self._position(term) for term in pantry) if p is not None]
+        if not positions:
+            return []
+        scores = {}
+        for position in positions:
+            start, stop = self.cooc_indptr[position], self.cooc_indptr[position + 1]
+            for partner, count in zip(self.cooc_indices[start:stop], self.cooc_counts[start:stop]):
+                scores[partner] = scores.get(partner, 0) + count / self.doc_freq[position]
+        for position in positions:
+            scores.pop(position, None)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_n]
+        return [(self.term(partner), float(score / len(positions))) for partner, score in ranked]
+
+    def calories(self, term):
+        """Calorie summary of the recipes using term, or None for an unknown token."""
+        position = self._position(term)
+        if position is None:
+            return None
+        return {
+            "recipes": int(self.calorie_count[position]),
+            "mean": float(self.calorie_mean[position]),
+            "median": float(self.calorie_median[position]),
+        }
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS)
+
+
+class IngredientStatsBuilder:
+    """
+    Accumulates the statistics chunk by chunk: token counts, the co-occurrence counts of each
+    chunk's binary recipe x token matrix and a per-token histogram of calories rounded to the
+    nearest calorie. Memory depends on the vocabulary and calorie range, not on the number
+    of recipes; build() only orders and cuts what was accumulated.
+    """
+
+    def __init__(self):
+        self.token_ids = {}
+        self.token_counts = np.zeros(0, dtype=np.int64)
+        self.cooc = csr_matrix((0, 0), dtype=np.int32)
+        self.calorie_totals = np.zeros(0, dtype=np.float64)
+        self.calorie_histogram = csr_matrix((0, 0), dtype=np.int32)
+        self.n_docs = 0
+
+    def add(self, documents, calories=None):
+        tokens = pd.Series(list(documents), dtype=object).fillna("").str.split().explode().dropna()
+        for token in tokens.unique():
+            self.token_ids.setdefault(token, len(self.token_ids))
+        n_terms = len(self.token_ids)
+        token_ids = tokens.map(self.token_ids).to_numpy(dtype=np.int64)
+        self.token_counts = _grow(self.token_counts, n_terms) + np.bincount(token_ids, minlength=n_terms)
+
+        # Binary recipe x token matrix of the chunk; its Gram matrix counts the recipes sharing
+        # two tokens, and the diagonal the recipes using one
+        pairs = pd.DataFrame({"row": tokens.index.to_numpy(dtype=np.int64), "token": token_ids}).drop_duplicates()
+        pair_rows, pair_tokens = pairs["row"].to_numpy(), pairs["token"].to_numpy()
+        binary = csr_matrix(
+            (np.ones(len(pair_rows), dtype=np.int32), (pair_rows, pair_tokens)), shape=(len(documents), n_terms)
+        )
+        self.cooc.resize((n_terms, n_terms))
+        self.cooc = self.cooc + binary.T @ binary
+
+        if calories is None:
+            calories = np.full(len(documents), np.nan)
+        calories = pd.to_numeric(pd.Series(list(calories)), errors="coerce").to_numpy(dtype=np.float64)[pair_rows]
+        known = np.isfinite(calories)
+        tokens_known, values = pair_tokens[known], calories[known]
+        self.calorie_totals = _grow(self.calorie_totals, n_terms) + np.bincount(
+            tokens_known, weights=values, minlength=n_terms
+        )
+        bins = np.rint(np.maximum(values, 0)).astype(np.int64)
+        width = max(self.calorie_histogram.shape[1], int(bins.max()) + 1 if len(bins) else 0)
+        self.calorie_histogram.resize((n_terms, width))
+        self.calorie_histogram = self.calorie_histogram + csr_matrix(
+            (np.ones(len(bins), dtype=np.int32), (tokens_known, bins)), shape=(n_terms, width)
+        )
+        self.n_docs += len(documents)
+
+    def build(self, top_k=COOC_TOP_K):
+        n_terms = len(self.token_ids)
+        terms = sorted(self.token_ids, key=lambda term: term.encode("utf-8"))
+        sorted_ids = np.empty(n_terms, dtype=np.int64)
+        sorted_ids[[self.token_ids[term] for term in terms]] = np.arange(n_terms)
+        # Arrival id of the token at each sorted position
+        renumber = np.argsort(sorted_ids)
+
+        token_counts = self.token_counts[renumber]
+        doc_freq = self.cooc.diagonal()[renumber].astype(np.int64)
+        cooc_indptr, cols, counts = _cut_rows(self.cooc, renumber, sorted_ids, top_k)
+
+        calorie_count, calorie_mean, calorie_median = self._calorie_summaries(
+            self.calorie_histogram[renumber].tocsr(), self.calorie_totals[renumber], n_terms
+        )
+        encoded_terms = np.array([term.encode("utf-8") for term in terms]) if terms else np.array([], dtype="S1")
+        return IngredientStats(
+            encoded_terms,
+            token_counts,
+            doc_freq,
+            np.lexsort((np.arange(n_terms), -token_counts)),
+            cooc_indptr,
+            cols.astype(np.int32),
+            counts.astype(np.int32),
+            calorie_count,
+            calorie_mean,
+            calorie_median,
+            self.n_docs,
+        )
+
+    @staticmethod
+    def _calorie_summaries(histogram, totals, n_terms):
+        histogram.sort_indices()
+        count = np.asarray(histogram.sum(axis=1)).ravel().astype(np.int64)
+        has_values = count > 0
+
+        # The k-th smallest value of a row is the first histogram bin whose running count,
+        # taken over the whole matrix, passes the row's offset plus k
+        running = np.cumsum(histogram.data)
+        offset = np.concatenate([[0], running])[histogram.indptr[:-1]]
+        lower = histogram.indices[np.searchsorted(running, (offset + (count - 1) // 2 + 1)[has_values])]
+        upper = histogram.indices[np.searchsorted(running, (offset + count // 2 + 1)[has_values])]
+
+        mean = np.full(n_terms, np.nan)
+        median = np.full(n_terms, np.nan)
+        mean[has_values] = totals[has_values] / count[has_values]
+        median[has_values] = (lower + upper) / 2
+        return count.astype(np.int32), mean, median
+
+
+def _grow(values, size):
+    """values padded with zeros to size."""
+    return np.concatenate([values, np.zeros(size - len(values), dtype=values.dtype)])
+
+
+def _cut_rows(cooc, renumber, sorted_ids, top_k, block_rows=COOC_BLOCK_ROWS):
+    """
+    The off-diagonal entries of each row of cooc in decreasing count order (ties by token),
+    cut to top_k, as (indptr, indices, counts), with rows and columns renumbered in sorted
+    token order. Rows are read and ordered a block at a time, so cooc is never copied whole.
+    """
+    indptr, indices, counts = [np.zeros(1, dtype=np.int64)], [], []
+    for start in range(0, cooc.shape[0], block_rows):
+        block = cooc[renumber[start:start + block_rows]].tocoo()
+        cols = sorted_ids[block.col]
+        off_diagonal = block.row + start != cols
+        rows, cols, values = block.row[off_diagonal], cols[off_diagonal], block.data[off_diagonal]
+        order = np.lexsort((cols, -values, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        row_lengths = np.bincount(rows, minlength=block.shape[0])
+        if top_k:
+            starts = np.concatenate([[0], np.cumsum(row_lengths)[:-1]])
+            keep = np.arange(len(rows)) - starts[rows] < top_k
+            rows, cols, values = rows[keep], cols[keep], values[keep]
+            row_lengths = np.bincount(rows, minlength=block.shape[0])
+        indptr.append(indptr[-1][-1] + np.cumsum(row_lengths))
+        indices.append(cols)
+        counts.append(values)
+    if not indices:
+        return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(indptr).astype(np.int64), np.concatenate(indices), np.concatenate(counts)
+
+
+def save_ingredient_stats(directory, stats):
+    os.makedirs(directory, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(stats, name))
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({"n_docs": stats.n_docs, "n_terms": len(stats.terms)}, f)
+
+
+def load_ingredient_stats(directory, mmap=True):
+    """Opens statistics written by save_ingredient_stats, or returns None for indexes built without them."""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+    return IngredientStats(n_docs=meta["n_docs"], **arrays)
@@ -0,0 +1,229 @@
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.index_store import CompactVocabulary
+
+META_FILE = "meta.json"
+GAP_WIDTHS = (1, 2, 4, 8)
+# Pairs a spilling builder reads into memory at once
+PAIR_BLOCK = 1 << 20
+
+
+class InvertedIndex:
+    """
+    Token -> sorted recipe ids over ingredients_cleaned.
+
+    Each posting list is stored as the gaps between consecutive ids, packed at the narrowest
+    byte width its largest gap fits in (1, 2, 4 or 8 bytes), so frequent tokens cost about a
+    byte per recipe. All lists share one byte buffer that can stay memory-mapped.
+    """
+
+    def __init__(self, terms, counts, offsets, widths, gaps, n_docs):
+        self.terms = terms
+        self.vocabulary = CompactVocabulary(terms)
+        self.counts = counts
+        self.offsets = offsets
+        self.widths = widths
+        self.gaps = gaps
+        self.n_docs = n_docs
+
+    @classmethod
+    def from_documents(cls, documents):
+        builder = InvertedIndexBuilder()
+        builder.add(documents)
+        return builder.build()
+
+    def _position(self, term):
+        return self.vocabulary.get(term) if len(self.terms) else None
+
+    def doc_freq(self, term):
+        position = self._position(term)
+        return 0 if position is None else int(self.counts[position])
+
+    def postings(self, term):
+        position = self._position(term)
+        if position is None:
+            return np.empty(0, dtype=np.int64)
+        start, stop = self.offsets[position], self.offsets[position + 1]
+        gaps = np.asarray(self.gaps[start:stop]).view(f"<u{self.widths[position]}")
+        return np.cumsum(gaps, dtype=np.int64)
+
+    def matching(self, tokens):
+        """Recipes containing every token, intersected from the shortest posting list up."""
+        rows = None
+        for token in sorted(set(tokens), key=self.doc_freq):
+            postings = self.postings(token)
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+            if not len(rows):
+                break
+        return np.empty(0, dtype=np.int64) if rows is None else rows
+
+    def candidates(self, include=(), exclude=(), any_of=()):
+        """
+        Sorted ids of the recipes matching every include clause, at least one any_of clause
+        and no exclude clause, where a clause is a list of tokens that must all be present.
+        Returns None when there are no constraints, i.e. every recipe is a candidate.
+        """
+        include = [clause for clause in include if clause]
+        exclude = [clause for clause in exclude if clause]
+        any_of = [clause for clause in any_of if clause]
+        if not (include or exclude or any_of):
+            return None
+
+        rows = None
+        for clause in sorted(include, key=lambda clause: min(self.doc_freq(token) for token in clause)):
+            matches = self.matching(clause)
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        if any_of:
+            matches = np.unique(np.concatenate([self.matching(clause) for clause in any_of]))
+            rows = matches if rows is None else np.intersect1d(rows, matches, assume_unique=True)
+        if exclude:
+            if rows is None:
+                rows = np.arange(self.n_docs, dtype=np.int64)
+            excluded = np.unique(np.concatenate([self.matching(clause) for clause in exclude]))
+            rows = np.setdiff1d(rows, excluded, assume_unique=True)
+        return rows
+
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.terms, self.counts, self.offsets, self.widths, self.gaps))
+
+
+class InvertedIndexBuilder:
+    """
+    Collects (token, recipe id) pairs chunk by chunk; build() packs them into an InvertedIndex.
+    With a spill_dir the pairs are appended to files there as they arrive and build() works
+    through them in blocks, so memory depends on the vocabulary, not on the number of recipes.
+    """
+
+    def __init__(self, spill_dir=None):
+        self.token_ids = {}
+        self.token_counts = np.zeros(0, dtype=np.int64)
+        self.pair_tokens = []
+        self.pair_rows = []
+        self.n_docs = 0
+        self.n_pairs = 0
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._files = {name: open(self._spill_path(name), "wb") for name in ("tokens", "rows")}
+
+    def _spill_path(self, name):
+        return os.path.join(self.spill_dir, f"{name}.bin")
+
+    def add(self, documents):
+        tokens = pd.Series(list(documents), dtype=object).fillna("").str.split().explode().dropna()
+        pairs = pd.DataFrame({"row": tokens.index.to_numpy(dtype=np.int64) + self.n_docs, "token": tokens.to_numpy()})
+        pairs = pairs.drop_duplicates()
+
+        for token in pairs["token"].unique():
+            self.token_ids.setdefault(token, len(self.token_ids))
+        pair_tokens = pairs["token"].map(self.token_ids).to_numpy(dtype=np.int32)
+        pair_rows = pairs["row"].to_numpy(dtype=np.int64)
+        counts = np.bincount(pair_tokens, minlength=len(self.token_ids)).astype(np.int64)
+        counts[:len(self.token_counts)] += self.token_counts
+        self.token_counts = counts
+
+        if self.spill_dir:
+            pair_tokens.tofile(self._files["tokens"])
+            pair_rows.tofile(self._files["rows"])
+        else:
+            self.pair_tokens.append(pair_tokens)
+            self.pair_rows.append(pair_rows)
+        self.n_pairs += len(pair_rows)
+        self.n_docs += len(documents)
+
+    def _pairs(self):
+        """Every (token, row) pair in arrival order, memory-mapped from the spill files when spilling."""
+        if not self.spill_dir:
+            if not self.pair_tokens:
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+            return np.concatenate(self.pair_tokens), np.concatenate(self.pair_rows)
+        for f in self._files.values():
+            f.close()
+        return self._scratch("tokens", np.int32, "r"), self._scratch("rows", np.int64, "r")
+
+    def _scratch(self, name, dtype, mode, size=None):
+        """An array of build(): in memory, or a file in spill_dir when spilling."""
+        if not self.spill_dir:
+            return np.empty(size, dtype=dtype)
+        if not (size if size is not None else os.path.getsize(self._spill_path(name))):
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._spill_path(name), dtype=dtype, mode=mode, shape=None if size is None else (size,))
+
+    def build(self):
+        terms = sorted(self.token_ids, key=lambda term: term.encode("utf-8"))
+        # Renumber tokens in sorted order, then group the pairs by token, ids ascending
+        sorted_ids = np.empty(len(terms), dtype=np.int64)
+        sorted_ids[[self.token_ids[term] for term in terms]] = np.arange(len(terms))
+        counts = np.empty(len(terms), dtype=np.int64)
+        counts[sorted_ids] = self.token_counts
+        starts = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # Counting sort, a block of pairs at a time: pairs arrive in recipe order and the
+        # sort within a block is stable, so every token's ids come out ascending
+        pair_tokens, pair_rows = self._pairs()
+        rows = self._scratch("sorted_rows", np.int64, "w+", self.n_pairs)
+        fill = starts[:-1].copy()
+        for start in range(0, self.n_pairs, PAIR_BLOCK):
+            tokens = sorted_ids[pair_tokens[start:start + PAIR_BLOCK]]
+            order = np.argsort(tokens, kind="stable")
+            tokens = tokens[order]
+            rank = np.arange(len(tokens)) - np.searchsorted(tokens, tokens)
+            rows[fill[tokens] + rank] = np.asarray(pair_rows[start:start + PAIR_BLOCK])[order]
+            fill += np.bincount(tokens, minlength=len(terms))
+
+        widths = np.empty(len(terms), dtype=np.uint8)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        out = open(self._spill_path("gaps"), "wb") if self.spill_dir else io.BytesIO()
+        for position in range(len(terms)):
+            largest = max((gaps.max() for gaps in _gaps(rows, starts[position], starts[position + 1])), default=0)
+            widths[position] = next(width for width in GAP_WIDTHS if largest < 1 << (8 * width))
+            for gaps in _gaps(rows, starts[position], starts[position + 1]):
+                out.write(gaps.astype(f"<u{widths[position]}").tobytes())
+            offsets[position + 1] = offsets[position] + counts[position] * int(widths[position])
+
+        if self.spill_dir:
+            out.close()
+            del pair_tokens, pair_rows, rows
+            for name in ("tokens", "rows", "sorted_rows"):
+                if os.path.exists(self._spill_path(name)):
+                    os.remove(self._spill_path(name))
+            gaps = self._scratch("gaps", np.uint8, "r")
+        else:
+            gaps = np.frombuffer(out.getvalue(), dtype=np.uint8)
+
+        encoded_terms = np.array([term.encode("utf-8") for term in terms]) if terms else np.array([], dtype="S1")
+        return InvertedIndex(encoded_terms, counts.astype(np.int32), offsets, widths, gaps, self.n_docs)
+
+
+def _gaps(rows, start, stop):
+    """The gaps of the posting list rows[start:stop], whose first gap is its first id, a block at a time."""
+    previous = 0
+    for block_start in range(start, stop, PAIR_BLOCK):
+        block = np.asarray(rows[block_start:min(block_start + PAIR_BLOCK, stop)])
+        yield np.diff(block, prepend=previous)
+        previous = block[-1]
+
+
+def save_inverted_index(directory, index):
+    os.makedirs(directory, exist_ok=True)
+    for name in ("terms", "counts", "offsets", "widths", "gaps"):
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(index, name))
+    with open(os.path.join(directory, META_FILE), "w") as f:
+        json.dump({"n_docs": index.n_docs, "n_terms": len(index.terms)}, f)
+
+
+def load_inverted_index(directory, mmap=True):
+    """Opens postings written by save_inverted_index, or returns None for indexes built without them."""
+    if not os.path.exists(os.path.join(directory, META_FILE)):
+        return None
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+        for name in ("terms", "counts", "offsets", "widths", "gaps")
+    }
+    return InvertedIndex(n_docs=meta["n_docs"], **arrays)
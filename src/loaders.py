@@ -1,6 +1,7 @@
 import streamlit as st
-import pickle
+import os
 from src.recommender import RecipeRecommender
+from src.calorie_predictor import CaloriePredictor
 
 class ModelLoader:
     # Responsible for loading and caching of all machine learning models and assets
@@ -13,32 +14,22 @@ class ModelLoader:
 
     @staticmethod
     @st.cache_resource
-    def load_calorie_assets():
-        # Loads all models related to calorie prediction
-        paths = {
-            "regressor": "src/models/calories_regressor.pkl",
-            "vectorizer": "src/models/tfidf_vectorizer_calories.pkl",
-            "scaler": "src/models/calorie_scaler.pkl",
-            "was_log_transformed": "src/models/was_log_transformed.pkl",
-            "classifier": "src/models/calorie_classifier.pkl"
-        }
-        
-        assets = {}
-        for key, path in paths.items():
-            with open(path, "rb") as f:
-                assets[key] = pickle.load(f)
-        return assets
+    def load_calorie_predictor():
+        # Loads the calorie regressor and classifier behind one predictor;
+        # CALORIE_MODEL=compact serves the sparse linear model instead of the forests
+        return CaloriePredictor.load(compact=os.getenv("CALORIE_MODEL", "forest") == "compact")
 
     @classmethod
-    def ensure_models_loaded(cls):
+    def ensure_models_loaded(cls, calorie_predictor=False):
+        # The calorie models are unpickled (pulling in sklearn) only by the pages that use them
         try:
             if "recommender" not in st.session_state:
                 with st.spinner("Loading recipe recommender..."):
                     st.session_state.recommender = cls.load_recommender()
 
-            if "calorie_models" not in st.session_state:
+            if calorie_predictor and "calorie_predictor" not in st.session_state:
                 with st.spinner("Loading calorie models..."):
-                    st.session_state.calorie_models = cls.load_calorie_assets()
+                    st.session_state.calorie_predictor = cls.load_calorie_predictor()
 
         except Exception as e:
             st.error("Failed to load required models.")
@@ -1,12 +1,43 @@
 import pandas as pd
+import numpy as np
 import os
 import pickle
+import shutil
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
 from src.utils.preprocess import Preprocessor
+from src.utils.ranking import select_top_k
+from src.sparse_store import load_sparse_matrix
+from src.index_store import IndexWriter, index_exists, open_index
+from src.ann_index import ImpactIndex, save_ann_index
+from src.dense_index import write_dense_embeddings
+from src.inverted_index import InvertedIndex, InvertedIndexBuilder, save_inverted_index
+from src.ingredient_stats import IngredientStats, IngredientStatsBuilder, save_ingredient_stats
+from src.scoring import TERM_COUNTS_FILE, count_terms, save_term_counts, unigram_columns
+from src.eda_summary import EDA_SUMMARY_FILE, EDASummaryBuilder, add_eda_features, build_eda_summary
+
+def clean_ingredient_chunk(ingredients):
+    """Cleans a chunk of raw ingredient lists; also returns the cache hits/misses it caused."""
+    before = Preprocessor.cache_stats()
+    cleaned = [' '.join(Preprocessor.clean_ingredients(item)) for item in ingredients]
+    after = Preprocessor.cache_stats()
+    counts = {
+        name: (after[name]["hits"] - before[name]["hits"], after[name]["misses"] - before[name]["misses"])
+        for name in after
+    }
+    return cleaned, counts
+
+def add_cache_counts(total, counts):
+    for name, (hits, misses) in counts.items():
+        total_hits, total_misses = total.get(name, (0, 0))
+        total[name] = (total_hits + hits, total_misses + misses)
 
 class RecipeVectorizer:
-    def __init__(self):
+    def __init__(self, n_workers=None, chunk_size=None):
         """Initialize paths and configuration from environment variables."""
         load_dotenv()
         self.raw_path = os.getenv("RAW_PATH")
@@ -14,6 +45,19 @@ class RecipeVectorizer:
         self.tfidf_matrix_path = os.getenv("TFIDF_MATRIX_PATH")
         self.vectorizer_path = os.getenv("VECTORIZER_PATH")
         self.recipes_path = os.getenv("RECIPES_PATH")
+        self.index_dir = os.getenv("INDEX_DIR")
+        self.delta_path = os.getenv("DELTA_PATH")
+        self.idf_drift_threshold = float(os.getenv("IDF_DRIFT_THRESHOLD", 0.05))
+        self.unseen_terms_threshold = float(os.getenv("UNSEEN_TERMS_THRESHOLD", 0.2))
+        self.neighbors_path = os.getenv("NEIGHBORS_PATH")
+        self.neighbors_top_k = int(os.getenv("NEIGHBORS_TOP_K", 20))
+        self.neighbors_chunk_size = int(os.getenv("NEIGHBORS_CHUNK_SIZE", 256))
+        self.neighbors_block_size = int(os.getenv("NEIGHBORS_BLOCK_SIZE", 16384))
+        self.ann_max_depth = int(os.getenv("ANN_MAX_DEPTH", 4096))
+        self.dense_components = int(os.getenv("DENSE_COMPONENTS", 128))
+        self.dense_dtype = os.getenv("DENSE_DTYPE", "float32")
+        self.n_workers = n_workers or int(os.getenv("PREPROCESS_WORKERS", 1))
+        self.chunk_size = chunk_size or int(os.getenv("PREPROCESS_CHUNK_SIZE", 2000))
         
         self.df = None
         self.vectorizer = TfidfVectorizer(
@@ -22,20 +66,55 @@ class RecipeVectorizer:
             max_df=0.8
         )
         self.tfidf_matrix = None
+        self.neighbor_index = None
 
     def load_and_preprocess(self):
         """Loads raw data and applies ingredient cleaning."""
         print(f"Loading data from {self.raw_path}...")
-        self.df = pd.read_csv(self.raw_path)
-
-        print("Cleaning ingredients...")
-        self.df['ingredients_cleaned'] = self.df['ingredients'].apply(Preprocessor.clean_ingredients)
-        self.df['ingredients_cleaned'] = self.df['ingredients_cleaned'].apply(lambda x: ' '.join(x))
+        print(f"Cleaning ingredients with {self.n_workers} worker(s)...")
+        chunks, counts = [], {}
+        for chunk, chunk_counts in self._iter_cleaned_chunks():
+            chunks.append(add_eda_features(chunk))
+            add_cache_counts(counts, chunk_counts)
+        self.df = pd.concat(chunks, ignore_index=True)
+        self._print_cache_stats(counts)
         
         # Save cleaned CSV
         self.df.to_csv(self.output_path, index=False)
         print(f"Cleaned data saved to {self.output_path}")
 
+    def _iter_cleaned_chunks(self):
+        """Yields the raw CSV chunk by chunk, in file order, with ingredients_cleaned added."""
+        chunks = pd.read_csv(self.raw_path, chunksize=self.chunk_size)
+        if self.n_workers <= 1:
+            for chunk in chunks:
+                chunk['ingredients_cleaned'], counts = clean_ingredient_chunk(chunk['ingredients'])
+                yield chunk, counts
+            return
+
+        # At most two chunks per worker are in flight, so memory stays bounded
+        # even when the caller streams the results to disk.
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=Preprocessor.warm_up) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(clean_ingredient_chunk, chunk['ingredients'].tolist())))
+                if len(pending) >= 2 * self.n_workers:
+                    yield self._collect_chunk(*pending.popleft())
+            while pending:
+                yield self._collect_chunk(*pending.popleft())
+
+    @staticmethod
+    def _collect_chunk(chunk, future):
+        cleaned, counts = future.result()
+        chunk['ingredients_cleaned'] = cleaned
+        return chunk, counts
+
+    @staticmethod
+    def _print_cache_stats(counts):
+        for name, (hits, misses) in counts.items():
+            lookups = hits + misses
+            print(f"{name} cache hit rate: {hits / lookups if lookups else 0.0:.1%} ({hits}/{lookups})")
+
     def train_vectorizer(self):
         """Fits the TF-IDF vectorizer to the cleaned ingredients."""
         if self.df is None:
@@ -49,24 +128,391 @@ class RecipeVectorizer:
         bigrams = [f for f in features if " " in f]
         print(f"Top 50 Bigrams: {bigrams[:50]}")
 
+    def build_neighbor_index(self, writer=None):
+        """
+        Precomputes the top-K most similar recipes of every recipe as a sparse CSR matrix.
+        With a SparseMatrixWriter the rows are appended to it chunk by chunk and nothing is
+        kept in memory; otherwise the matrix is stored in self.neighbor_index.
+        """
+        if self.tfidf_matrix is None:
+            raise ValueError("TF-IDF matrix is empty. Run train_vectorizer() first.")
+
+        print(f"Building top-{self.neighbors_top_k} neighbor index...")
+        n_recipes = self.tfidf_matrix.shape[0]
+        blocks = []
+
+        # Rows are L2-normalised, so the dot product is the cosine similarity. Each chunk of
+        # rows is scored against one block of the corpus at a time and only the running
+        # top-K survives a block, so memory is chunk_size x block_size whatever the corpus size.
+        for start in range(0, n_recipes, self.neighbors_chunk_size):
+            stop = min(start + self.neighbors_chunk_size, n_recipes)
+            chunk = self.tfidf_matrix[start:stop]
+            neighbor_ids = np.full((stop - start, 0), -1, dtype=np.int64)
+            neighbor_scores = np.full((stop - start, 0), -np.inf, dtype=np.float32)
+            for block_start in range(0, n_recipes, self.neighbors_block_size):
+                block_stop = min(block_start + self.neighbors_block_size, n_recipes)
+                # Multiplying from the corpus side never copies (or transposes) the full matrix
+                block_scores = (self.tfidf_matrix[block_start:block_stop] @ chunk.T).T.toarray().astype(np.float32)
+                own = np.arange(max(start, block_start), min(stop, block_stop))
+                block_scores[own - start, own - block_start] = -np.inf
+
+                block_ids, block_top = select_top_k(block_scores, self.neighbors_top_k)
+                # The running best come first, so ties still go to the lower recipe id
+                merged_ids = np.hstack([neighbor_ids, block_ids + block_start])
+                positions, neighbor_scores = select_top_k(np.hstack([neighbor_scores, block_top]), self.neighbors_top_k)
+                neighbor_ids = np.take_along_axis(merged_ids, positions, axis=1)
+
+            # Each row keeps its neighbors in descending similarity order
+            keep = neighbor_scores > 0
+            block = csr_matrix(
+                (
+                    neighbor_scores[keep],
+                    neighbor_ids[keep].astype(np.int32),
+                    np.concatenate([[0], np.cumsum(keep.sum(axis=1))]),
+                ),
+                shape=(stop - start, n_recipes),
+            )
+            if writer is None:
+                blocks.append(block)
+            else:
+                writer.append(block)
+
+        if writer is None:
+            self.neighbor_index = vstack(blocks, format="csr") if blocks else csr_matrix((0, n_recipes), dtype=np.float32)
+
+    def write_neighbor_index(self, index):
+        """Streams the neighbor index into the index being built; NEIGHBORS_TOP_K=0 skips it."""
+        if not self.neighbors_top_k:
+            print("Skipping the neighbor index; similar recipes are scored on demand.")
+            return
+        writer = index.matrix_writer("neighbors", self.tfidf_matrix.shape[0])
+        self.build_neighbor_index(writer)
+        writer.close()
+
+    def stream_vocabulary(self):
+        """
+        First streaming pass: cleans the raw CSV chunk by chunk, appends it to the cleaned CSV
+        and counts document frequencies, then fixes the vocabulary and IDF weights exactly as
+        TfidfVectorizer.fit would.
+        """
+        print(f"Streaming {self.raw_path} in chunks of {self.chunk_size} rows...")
+        analyzer = self.vectorizer.build_analyzer()
+        doc_freq = Counter()
+        n_docs = 0
+        counts = {}
+
+        for i, (chunk, chunk_counts) in enumerate(self._iter_cleaned_chunks()):
+            chunk = add_eda_features(chunk)
+            chunk.to_csv(self.output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            for doc in chunk['ingredients_cleaned']:
+                doc_freq.update(set(analyzer(doc)))
+            n_docs += len(chunk)
+            add_cache_counts(counts, chunk_counts)
+
+        self._print_cache_stats(counts)
+        print(f"Cleaned data saved to {self.output_path}")
+
+        # Same document-frequency limits as CountVectorizer._limit_features
+        max_df, min_df = self.vectorizer.max_df, self.vectorizer.min_df
+        max_doc_count = max_df if isinstance(max_df, int) else max_df * n_docs
+        min_doc_count = min_df if isinstance(min_df, int) else min_df * n_docs
+        terms = sorted(term for term, df in doc_freq.items() if min_doc_count <= df <= max_doc_count)
+        if not terms:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+        # Smoothed IDF, as computed by TfidfTransformer
+        dfs = np.array([doc_freq[term] for term in terms], dtype=np.float64)
+        self.vectorizer.set_params(vocabulary={term: i for i, term in enumerate(terms)})
+        self.vectorizer.idf_ = np.log((1 + n_docs) / (1 + dfs)) + 1
+        print(f"Vocabulary fixed: {len(terms)} terms over {n_docs} recipes")
+
+    def stream_tfidf_matrix(self, index):
+        """Second streaming pass: writes TF-IDF rows and recipe columns straight into the index being built."""
+        print(f"Writing TF-IDF rows to {index.path('tfidf')}...")
+        matrix_writer = index.matrix_writer("tfidf", len(self.vectorizer.vocabulary_))
+        recipes_writer = index.recipes_writer()
+        summary = EDASummaryBuilder()
+        # Postings spill to disk as they are collected; the spill files are dropped once packed
+        postings = InvertedIndexBuilder(index.path("postings.spill"))
+        ingredient_stats = IngredientStatsBuilder()
+        for chunk in pd.read_csv(self.output_path, chunksize=self.chunk_size):
+            chunk['ingredients_cleaned'] = chunk['ingredients_cleaned'].fillna('')
+            matrix_writer.append(self.vectorizer.transform(chunk['ingredients_cleaned']))
+            recipes_writer.append(chunk)
+            summary.add(chunk)
+            postings.add(chunk['ingredients_cleaned'])
+            ingredient_stats.add(chunk['ingredients_cleaned'], chunk['calories'])
+        matrix_writer.close()
+        recipes_writer.close()
+        index.write_json(EDA_SUMMARY_FILE, summary.summary())
+        save_inverted_index(index.path("postings"), postings.build())
+        shutil.rmtree(index.path("postings.spill"))
+        save_ingredient_stats(index.path("ingredient_stats"), ingredient_stats.build())
+
+        self.tfidf_matrix = load_sparse_matrix(index.path("tfidf"))
+        return recipes_writer.n_rows
+
     def save_models(self):
-        artifacts = {
-            self.tfidf_matrix_path: self.tfidf_matrix,
-            self.vectorizer_path: self.vectorizer,
-            self.recipes_path: self.df
+        """Writes the vocabulary, matrices and recipes as a memory-mapped index to INDEX_DIR."""
+        index = IndexWriter(self.index_dir)
+        index.write_vectorizer(self.vectorizer)
+        index.write_matrix("tfidf", self.tfidf_matrix)
+        if self.neighbor_index is not None:
+            index.write_matrix("neighbors", self.neighbor_index)
+        self.write_term_counts(index)
+        self.write_ann_index(index)
+        self.write_dense_embeddings(index)
+        index.write_recipes(self.df)
+        save_inverted_index(index.path("postings"), InvertedIndex.from_documents(self.df['ingredients_cleaned']))
+        save_ingredient_stats(
+            index.path("ingredient_stats"),
+            IngredientStats.from_documents(self.df['ingredients_cleaned'], self.df['calories'])
+        )
+        index.write_json(EDA_SUMMARY_FILE, build_eda_summary(self.df))
+        index.commit(len(self.df))
+        
+        print(f"Index saved to {self.index_dir}")
+
+    def write_term_counts(self, index):
+        """Stores every recipe's ingredient term count, read by the hybrid scorer."""
+        save_term_counts(index.path(TERM_COUNTS_FILE), count_terms(self.tfidf_matrix, unigram_columns(self.vectorizer)))
+
+    def write_ann_index(self, index):
+        """Builds the impact-ordered postings used by RecipeRecommender(backend="ann")."""
+        print("Building impact index for approximate search...")
+        save_ann_index(index.path("ann"), ImpactIndex.build(self.tfidf_matrix, self.ann_max_depth))
+
+    def write_dense_embeddings(self, index):
+        """Projects the TF-IDF rows onto a TruncatedSVD basis for RecipeRecommender(backend="dense")."""
+        if not self.dense_components:
+            return
+        print(f"Writing {self.dense_components}-d {self.dense_dtype} embeddings...")
+        write_dense_embeddings(index.path("dense"), self.tfidf_matrix, self.dense_components, self.dense_dtype)
+
+    def export_index(self):
+        """Converts the legacy pickled artifacts into the index format, without cleaning again."""
+        with open(self.vectorizer_path, 'rb') as file:
+            self.vectorizer = pickle.load(file)
+        with open(self.tfidf_matrix_path, 'rb') as file:
+            self.tfidf_matrix = pickle.load(file)
+        with open(self.recipes_path, 'rb') as file:
+            self.df = add_eda_features(pickle.load(file).reset_index(drop=True))
+
+        if self.neighbors_path and os.path.exists(self.neighbors_path):
+            with open(self.neighbors_path, 'rb') as file:
+                self.neighbor_index = pickle.load(file)
+        elif self.neighbors_top_k:
+            self.build_neighbor_index()
+        self.save_models()
+
+    def load_base_index(self):
+        """Opens the frozen vectorizer and TF-IDF matrix of the last full build."""
+        if index_exists(self.index_dir):
+            index = open_index(self.index_dir)
+            self.vectorizer = index["vectorizer"]
+            self.tfidf_matrix = index["tfidf_matrix"]
+            return
+
+        with open(self.vectorizer_path, 'rb') as file:
+            self.vectorizer = pickle.load(file)
+        with open(self.tfidf_matrix_path, 'rb') as file:
+            self.tfidf_matrix = pickle.load(file)
+
+    def load_delta(self):
+        """Returns the pending incremental changes, or None when the index is fully built."""
+        if not self.delta_path or not os.path.exists(self.delta_path):
+            return None
+        with open(self.delta_path, 'rb') as file:
+            return pickle.load(file)
+
+    def update_index(self, new_recipes=None, deleted_titles=(), deleted_ids=()):
+        """
+        Adds, updates and deletes recipes against the frozen vocabulary without refitting.
+
+        New rows are appended to the delta at DELTA_PATH; a recipe whose title already exists
+        is replaced, i.e. its old row is tombstoned. Titles are not unique in the catalog, so a
+        title shared by several live recipes is rejected; delete those by recipe id instead.
+        Rows are numbered after the base ones, so recipe ids stay stable until the next full
+        build. Returns the refit policy report, whose not_found lists the deleted_titles that
+        matched no live recipe.
+        """
+        self.load_base_index()
+        base_rows = self.tfidf_matrix.shape[0]
+        delta = self.load_delta() or {
+            "version": 0,
+            "base_rows": base_rows,
+            "matrix": csr_matrix((0, self.tfidf_matrix.shape[1])),
+            "recipes": pd.DataFrame(),
+            "deleted": np.array([], dtype=np.int64),
+            "unseen_terms": 0,
+            "total_terms": 0,
         }
+        if delta["base_rows"] != base_rows:
+            raise ValueError("Pending delta belongs to a different build. Run a full build first.")
 
-        for path, obj in artifacts.items():
-            with open(path, 'wb') as file:
-                pickle.dump(obj, file)
-        
-        print(f"All models saved to designated paths.")
+        deleted = set(delta["deleted"].tolist())
+        titles = pd.read_csv(self.output_path, usecols=['title'])['title'].tolist()
+        titles += delta["recipes"].get('title', pd.Series(dtype=object)).tolist()
+        live_ids = {}
+        for i, title in enumerate(titles):
+            if i not in deleted:
+                live_ids.setdefault(title, []).append(i)
+
+        replaced = [] if new_recipes is None else new_recipes['title'].tolist()
+        repeated = sorted(set(pd.Series(replaced, dtype=object)[lambda t: t.duplicated()]))
+        if repeated:
+            raise ValueError(f"New recipes repeat the titles {repeated}; each title can be added once.")
+        targets = set(deleted_titles) | set(replaced)
+        ambiguous = {title: live_ids[title] for title in targets if len(live_ids.get(title, ())) > 1}
+        if ambiguous:
+            raise ValueError(f"Titles shared by several recipes, delete them by id instead: {ambiguous}")
+        unknown = [i for i in deleted_ids if not 0 <= i < len(titles) or i in deleted]
+        if unknown:
+            raise ValueError(f"No live recipes with ids {unknown}.")
+        not_found = [title for title in dict.fromkeys(deleted_titles) if title not in live_ids]
+
+        deleted.update(deleted_ids)
+        for title in list(deleted_titles) + replaced:
+            deleted.update(live_ids.pop(title, ()))
+
+        if new_recipes is not None and len(new_recipes):
+            new_recipes = new_recipes.reset_index(drop=True).copy()
+            # Scraped records hold lists; the stored recipes keep their string form
+            for col in ('ingredients', 'instructions'):
+                if col in new_recipes:
+                    new_recipes[col] = new_recipes[col].apply(lambda x: str(x) if isinstance(x, list) else x)
+            new_recipes['ingredients_cleaned'], _ = clean_ingredient_chunk(new_recipes['ingredients'])
+
+            # Most bigrams are pruned by min_df anyway, so only unigrams tell whether
+            # the frozen vocabulary still covers the new recipes
+            analyzer = self.vectorizer.build_analyzer()
+            for doc in new_recipes['ingredients_cleaned']:
+                terms = [term for term in analyzer(doc) if " " not in term]
+                delta["unseen_terms"] += sum(term not in self.vectorizer.vocabulary_ for term in terms)
+                delta["total_terms"] += len(terms)
+
+            delta["matrix"] = vstack([delta["matrix"], self.vectorizer.transform(new_recipes['ingredients_cleaned'])]).tocsr()
+            delta["recipes"] = pd.concat([delta["recipes"], new_recipes], ignore_index=True)
+
+        delta["deleted"] = np.array(sorted(deleted), dtype=np.int64)
+        delta["version"] += 1
+
+        # Written to a temporary file first so a running recommender never reads half a delta
+        tmp_path = f"{self.delta_path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(delta, file)
+        os.replace(tmp_path, self.delta_path)
+
+        policy = self.refit_policy(delta)
+        policy["not_found"] = not_found
+        if not_found:
+            print(f"No live recipes titled {not_found}; nothing deleted for them.")
+        print(
+            f"Delta v{delta['version']}: {delta['matrix'].shape[0]} added, {len(deleted)} deleted. "
+            f"IDF drift {policy['idf_drift']:.2%}, unseen terms {policy['unseen_term_rate']:.2%}"
+            + (" - full refit due." if policy['refit_due'] else ".")
+        )
+        return policy
+
+    def refit_policy(self, delta):
+        """
+        Decides whether the frozen vocabulary is still good enough. A full refit is due when
+        the IDF the current recipes would produce drifts from the frozen IDF by more than
+        IDF_DRIFT_THRESHOLD (mean relative change), or when more than UNSEEN_TERMS_THRESHOLD
+        of the words in new recipes are missing from the vocabulary.
+        """
+        n_terms = self.tfidf_matrix.shape[1]
+        base_rows = self.tfidf_matrix.shape[0]
+        deleted = delta["deleted"]
+
+        # One CSR entry per (recipe, term), so counting column indices gives document frequencies
+        doc_freq = np.bincount(self.tfidf_matrix.indices, minlength=n_terms)
+        doc_freq += np.bincount(delta["matrix"].indices, minlength=n_terms)
+        deleted_base, deleted_delta = deleted[deleted < base_rows], deleted[deleted >= base_rows] - base_rows
+        doc_freq -= np.bincount(self.tfidf_matrix[deleted_base].indices, minlength=n_terms)
+        doc_freq -= np.bincount(delta["matrix"][deleted_delta].indices, minlength=n_terms)
+
+        n_docs = base_rows + delta["matrix"].shape[0] - len(deleted)
+        current_idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+        idf_drift = float(np.mean(np.abs(current_idf - self.vectorizer.idf_) / self.vectorizer.idf_))
+        unseen_term_rate = delta["unseen_terms"] / delta["total_terms"] if delta["total_terms"] else 0.0
+
+        return {
+            "idf_drift": idf_drift,
+            "unseen_term_rate": unseen_term_rate,
+            "refit_due": idf_drift > self.idf_drift_threshold or unseen_term_rate > self.unseen_terms_threshold,
+        }
+
+    def fold_delta(self):
+        """Rewrites the raw CSV with the pending delta applied, so that a full build includes it."""
+        delta = self.load_delta()
+        if delta is None:
+            return
+
+        print(f"Folding delta v{delta['version']} into {self.raw_path}...")
+        deleted = set(delta["deleted"].tolist())
+        tmp_path = f"{self.raw_path}.tmp"
+        raw_columns = pd.read_csv(self.raw_path, nrows=0).columns
+        pd.DataFrame(columns=raw_columns).to_csv(tmp_path, index=False)
+        row = 0
+        for chunk in pd.read_csv(self.raw_path, chunksize=self.chunk_size):
+            keep = [row + j not in deleted for j in range(len(chunk))]
+            chunk[keep].to_csv(tmp_path, mode='a', header=False, index=False)
+            row += len(chunk)
+
+        added = delta["recipes"]
+        keep = [row + j not in deleted for j in range(len(added))]
+        added[keep].reindex(columns=raw_columns).to_csv(tmp_path, mode='a', header=False, index=False)
+
+        os.replace(tmp_path, self.raw_path)
+        os.remove(self.delta_path)
 
     def run_pipeline(self):
+        self.fold_delta()
         self.load_and_preprocess()
         self.train_vectorizer()
+        if self.neighbors_top_k:
+            self.build_neighbor_index()
         self.save_models()
 
+    def run_streaming_pipeline(self):
+        """
+        Out-of-core build for catalogs larger than RAM: peak memory depends on chunk_size and
+        the vocabulary, not on the number of recipes.
+        """
+        self.fold_delta()
+        index = IndexWriter(self.index_dir)
+        self.stream_vocabulary()
+        n_recipes = self.stream_tfidf_matrix(index)
+        self.write_neighbor_index(index)
+
+        index.write_vectorizer(self.vectorizer)
+        self.write_term_counts(index)
+        self.write_ann_index(index)
+        self.write_dense_embeddings(index)
+        index.commit(n_recipes)
+        print(f"Index saved to {self.index_dir}")
+
 if __name__ == "__main__":
-    trainer = RecipeVectorizer()
-    trainer.run_pipeline()
+    parser = argparse.ArgumentParser(description="Build the recipe TF-IDF index.")
+    parser.add_argument("--streaming", action="store_true", help="build out of core, chunk by chunk")
+    parser.add_argument("--workers", type=int, help="processes used to clean ingredients")
+    parser.add_argument("--chunk-size", type=int, help="rows per cleaning/streaming chunk")
+    parser.add_argument("--no-neighbors", action="store_true", help="skip the quadratic neighbor index build")
+    parser.add_argument("--add", metavar="CSV", help="incrementally add or update the recipes in CSV")
+    parser.add_argument("--delete", metavar="TITLE", nargs="+", default=[], help="incrementally delete recipes by title")
+    parser.add_argument("--delete-id", metavar="ID", type=int, nargs="+", default=[], help="incrementally delete recipes by id")
+    parser.add_argument("--export-index", action="store_true", help="convert the legacy pickles into the index format")
+    args = parser.parse_args()
+
+    trainer = RecipeVectorizer(n_workers=args.workers, chunk_size=args.chunk_size)
+    if args.no_neighbors:
+        trainer.neighbors_top_k = 0
+    if args.export_index:
+        trainer.export_index()
+    elif args.add or args.delete or args.delete_id:
+        trainer.update_index(pd.read_csv(args.add) if args.add else None, args.delete, args.delete_id)
+    elif args.streaming:
+        trainer.run_streaming_pipeline()
+    else:
+        trainer.run_pipeline()
@@ -2,61 +2,610 @@ import pickle
 import os
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy.sparse import vstack
 from dotenv import load_dotenv
 from collections import Counter
+from src.utils.ranking import select_top_k
+from src.utils import metrics
+from src.utils.query_cache import QueryCache
+from src.index_store import RecipeColumns, index_exists, open_index
+from src.inverted_index import InvertedIndex, load_inverted_index
+from src.ingredient_stats import IngredientStats, load_ingredient_stats
+from src.autocomplete import IngredientAutocomplete
+from src.scoring import TERM_COUNTS_FILE, count_terms, load_term_counts, make_scorer, unigram_columns
+from src.ann_index import ImpactIndex, load_ann_index
+from src.dense_index import DenseEmbeddings, load_dense_embeddings
+from src.utils.preprocess import Preprocessor
 
 load_dotenv()
 
 VECTORIZER_PATH = os.getenv("VECTORIZER_PATH")
 TFIDF_MATRIX_PATH = os.getenv("TFIDF_MATRIX_PATH")
 RECIPES_PATH = os.getenv("RECIPES_PATH")
+INDEX_DIR = os.getenv("INDEX_DIR")
+NEIGHBORS_PATH = os.getenv("NEIGHBORS_PATH")
+DELTA_PATH = os.getenv("DELTA_PATH")
+
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 256))
+ANN_DEPTH = int(os.getenv("ANN_DEPTH", 200))
+ANN_MAX_DEPTH = int(os.getenv("ANN_MAX_DEPTH", 4096))
+DENSE_COMPONENTS = int(os.getenv("DENSE_COMPONENTS", 128))
+DENSE_DTYPE = os.getenv("DENSE_DTYPE", "float32")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 1024))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 600))
+
+BACKENDS = ("exact", "ann", "dense")
+
+RESULT_COLUMNS = ["image", "title", "calories", "serves", "total time", "similarity", "score", "ingredients"]
+SCORE_COLUMNS = ("similarity", "score")
+# Recipe columns a serving process reads: the displayed ones and ingredients_cleaned.
+# Instructions, descriptions and EDA features stay on disk.
+SERVING_COLUMNS = [col for col in RESULT_COLUMNS if col not in SCORE_COLUMNS] + ["ingredients_cleaned"]
 
 class RecipeRecommender:
-    def __init__(self):
+    def __init__(self, backend="exact", depth=ANN_DEPTH):
+        """backend="ann" or "dense" selects approximate scoring; see set_backend."""
+        if index_exists(INDEX_DIR):
+            # Memory-mapped: nothing is deserialised, and every process serving the
+            # same index shares its pages through the OS cache
+            index = open_index(INDEX_DIR, recipe_columns=SERVING_COLUMNS)
+            self.index_id = index["manifest"]["build_id"]
+            postings = load_inverted_index(os.path.join(INDEX_DIR, "postings"))
+            term_counts = load_term_counts(os.path.join(INDEX_DIR, TERM_COUNTS_FILE))
+            self._setup(
+                index["vectorizer"], index["tfidf_matrix"], index["recipes"], index["neighbor_index"], postings, term_counts
+            )
+            self._ingredient_stats = load_ingredient_stats(os.path.join(INDEX_DIR, "ingredient_stats"))
+            self.set_backend(backend, depth)
+            self.refresh()
+            return
+
+        # Legacy pickled artifacts (see RecipeVectorizer.export_index)
         with open(VECTORIZER_PATH, "rb") as f:
-            self.vectorizer = pickle.load(f)
+            vectorizer = pickle.load(f)
 
         with open(TFIDF_MATRIX_PATH, "rb") as f:
-            self.tfidf_matrix = pickle.load(f)
+            tfidf_matrix = pickle.load(f)
 
         with open(RECIPES_PATH, "rb") as f:
-            self.df = pickle.load(f)
+            df = pickle.load(f)
+
+        neighbor_index = None
+        if NEIGHBORS_PATH and os.path.exists(NEIGHBORS_PATH):
+            with open(NEIGHBORS_PATH, "rb") as f:
+                neighbor_index = pickle.load(f)
+
+        self.index_id = None
+        recipes = RecipeColumns.from_frame(df.reset_index(drop=True), SERVING_COLUMNS)
+        del df
+        self._setup(vectorizer, tfidf_matrix, recipes, neighbor_index)
+        self.set_backend(backend, depth)
+        self.refresh()
+
+    @classmethod
+    def from_artifacts(cls, vectorizer, tfidf_matrix, df, neighbor_index=None, backend="exact", depth=ANN_DEPTH, ann_index=None, dense_index=None):
+        """Builds a recommender from in-memory artifacts instead of the stored ones."""
+        recommender = cls.__new__(cls)
+        recommender.index_id = None
+        recommender._setup(vectorizer, tfidf_matrix, RecipeColumns.from_frame(df.reset_index(drop=True), SERVING_COLUMNS), neighbor_index)
+        recommender.set_backend(backend, depth, ann_index, dense_index)
+        return recommender
+
+    def _setup(self, vectorizer, tfidf_matrix, recipes, neighbor_index, postings=None, term_counts=None):
+        self.vectorizer = vectorizer
+        self.tfidf_matrix = tfidf_matrix.tocsr()
+        self.recipes = recipes
+        self.neighbor_index = neighbor_index
+        # Indexes built before postings were stored get them rebuilt in memory
+        self.postings = postings or InvertedIndex.from_documents(self.recipes.column("ingredients_cleaned"))
+
+        # Columns used for filtering are kept as plain arrays for the scoring path
+        self.calories = self.recipes.numeric("calories", np.float32)
+        self.result_columns = [col for col in RESULT_COLUMNS if col in self.recipes or col in SCORE_COLUMNS]
+
+        # Per-recipe ingredient term counts for the hybrid scorer; indexes built before
+        # they were stored get them counted from the matrix
+        self.unigrams = unigram_columns(vectorizer)
+        self.term_counts = count_terms(self.tfidf_matrix, self.unigrams) if term_counts is None else term_counts
+
+        # Incremental updates: rows appended after the base build, and tombstoned rows
+        self.base_rows = self.tfidf_matrix.shape[0]
+        self.n_recipes = self.base_rows
+        self.delta_matrix = None
+        self.delta_recipes = None
+        self.delta_postings = None
+        self.delta_embeddings = None
+        self.deleted = None
+        self.index_version = 0
+
+        self.backend = "exact"
+        self.depth = ANN_DEPTH
+        self.ann_index = None
+        self.dense_index = None
+        self.query_cache = QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self._ingredient_stats = None
+        self._autocomplete = None
+        self.scorer = make_scorer()
+
+    @property
+    def ingredient_stats(self) -> IngredientStats:
+        """Token frequencies, co-occurrences and calorie summaries of the base catalog."""
+        if self._ingredient_stats is None:
+            # Indexes built before the statistics were stored get them computed on first use
+            self._ingredient_stats = IngredientStats.from_documents(
+                self.recipes.column("ingredients_cleaned"), self.recipes.numeric("calories")
+            )
+        return self._ingredient_stats
+
+    @property
+    def autocomplete(self) -> IngredientAutocomplete:
+        """Prefix and spelling suggestions over the vectorizer vocabulary, built on first use."""
+        if self._autocomplete is None:
+            self._autocomplete = IngredientAutocomplete.from_vectorizer(self.vectorizer, self.tfidf_matrix)
+        return self._autocomplete
+
+    def set_backend(self, backend, depth=None, ann_index=None, dense_index=None):
+        """
+        Switches between exact scoring and approximate search.
+
+        With "ann", each query scores only the recipes among the first depth entries of its
+        terms' impact-ordered lists (plus recipes added since the build); a larger depth raises
+        recall and latency. With "dense", recipes are scored by one dense matvec over their
+        low-rank TruncatedSVD embeddings. The structures stored with the index are used when
+        there are some, otherwise they are built in memory.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}.")
+
+        if backend == "ann" and ann_index is None and self.ann_index is None:
+            if self.index_id is not None:
+                ann_index = load_ann_index(os.path.join(INDEX_DIR, "ann"))
+            if ann_index is None:
+                ann_index = ImpactIndex.build(self.tfidf_matrix, ANN_MAX_DEPTH)
+        if ann_index is not None:
+            self.ann_index = ann_index
+
+        if backend == "dense" and dense_index is None and self.dense_index is None:
+            if self.index_id is not None:
+                dense_index = load_dense_embeddings(os.path.join(INDEX_DIR, "dense"))
+            if dense_index is None:
+                dense_index = DenseEmbeddings.build(self.tfidf_matrix, DENSE_COMPONENTS, DENSE_DTYPE)
+        if dense_index is not None:
+            self.dense_index = dense_index
+            self.delta_embeddings = None
+        if depth is not None:
+            self.depth = depth
+        self.backend = backend
+        self.query_cache.clear()
+
+    def set_scorer(self, scorer):
+        """
+        Replaces how recipes are ranked: a CosineScorer or HybridScorer (see src.scoring),
+        or their name, "cosine" or "hybrid".
+        """
+        self.scorer = make_scorer(scorer) if isinstance(scorer, str) else scorer
+        self.query_cache.clear()
+
+    def refresh(self):
+        """
+        Picks up recipes added, updated or deleted by RecipeVectorizer.update_index without a
+        full reload. Only rows appended since the last refresh are read in; the base matrix is
+        left untouched. Returns True when something changed.
+        """
+        if not DELTA_PATH or not os.path.exists(DELTA_PATH):
+            return False
+
+        with open(DELTA_PATH, "rb") as f:
+            delta = pickle.load(f)
+        if delta["version"] <= self.index_version:
+            return False
+        if delta["base_rows"] != self.base_rows:
+            raise ValueError("The index was rebuilt since this recommender was loaded. Reload it.")
+
+        applied = self.n_recipes - self.base_rows
+        new_recipes = delta["recipes"].iloc[applied:]
+        if len(new_recipes):
+            self.delta_matrix = delta["matrix"].astype(self.tfidf_matrix.dtype)
+            self.delta_recipes = RecipeColumns.from_frame(delta["recipes"], SERVING_COLUMNS)
+            self.delta_postings = InvertedIndex.from_documents(delta["recipes"]["ingredients_cleaned"])
+            self.term_counts = np.concatenate([
+                self.term_counts[:self.base_rows], count_terms(self.delta_matrix, self.unigrams)
+            ])
+            self.delta_embeddings = None
+            self.calories = np.concatenate([self.calories, new_recipes["calories"].to_numpy(dtype=np.float32)])
+            self.n_recipes = self.base_rows + len(delta["recipes"])
+
+        self.deleted = None
+        if len(delta["deleted"]):
+            self.deleted = np.zeros(self.n_recipes, dtype=bool)
+            self.deleted[delta["deleted"]] = True
+
+        self.index_version = delta["version"]
+        return True
+
+    def _corpus_parts(self, rows):
+        """The base and delta matrices, restricted to rows (sorted ids) when given."""
+        if rows is None:
+            parts = [self.tfidf_matrix]
+            if self.delta_matrix is not None:
+                parts.append(self.delta_matrix)
+            return parts
+
+        split = np.searchsorted(rows, self.base_rows)
+        parts = [self.tfidf_matrix[rows[:split]]]
+        if split < len(rows):
+            parts.append(self.delta_matrix[rows[split:] - self.base_rows])
+        return parts
+
+    def _dense_scores(self, input_vectors, rows=None):
+        """(n_queries, n_rows) cosine scores in the embedding space."""
+        queries = self.dense_index.embed(input_vectors)
+        if rows is None:
+            base, added = None, np.arange(self.n_recipes - self.base_rows)
+        else:
+            split = np.searchsorted(rows, self.base_rows)
+            base, added = rows[:split], rows[split:] - self.base_rows
+
+        scores = [self.dense_index.score(queries, base).T]
+        if len(added):
+            # Recipes added since the build are embedded on first use
+            if self.delta_embeddings is None:
+                self.delta_embeddings = self.dense_index.embed(self.delta_matrix)
+            scores.append(queries @ self.delta_embeddings[added].T)
+        return np.hstack(scores)
+
+    def _score(self, input_vector, rows=None):
+        if self.backend == "dense":
+            return self._dense_scores(input_vector, rows)[0]
+        # TF-IDF rows are L2-normalised, so a sparse matvec gives the cosine similarity
+        query = input_vector.toarray().ravel().astype(self.tfidf_matrix.dtype)
+        return np.concatenate([part @ query for part in self._corpus_parts(rows)])
+
+    def _score_many(self, input_vectors, rows=None):
+        if self.backend == "dense":
+            return self._dense_scores(input_vectors, rows)
+        input_vectors = input_vectors.astype(self.tfidf_matrix.dtype)
+        # Multiplying from the corpus side never copies or transposes the corpus matrix
+        return np.hstack([(part @ input_vectors.T).T.toarray() for part in self._corpus_parts(rows)])
+
+    def _pantry_hits(self, input_vector, rows):
+        """For each of rows, how many of its single-word terms are among the query's."""
+        return self._pantry_hits_many(input_vector, rows[None])[0]
+
+    def _pantry_hits_many(self, input_vectors, ids):
+        """
+        _pantry_hits for a block of queries: ids is (n_queries, n) and entry [i, j] counts the
+        terms recipe ids[i, j] shares with query i. Every distinct recipe is read once and the
+        counts come from one product of binary term matrices.
+        """
+        unique, inverse = np.unique(ids, return_inverse=True)
+        pantries = input_vectors.tocsr(copy=True)
+        pantries.data = self.unigrams[pantries.indices].astype(np.int32)
+        recipes = vstack(self._corpus_parts(unique), format="csr")
+        recipes.data = np.ones_like(recipes.data, dtype=np.int32)
+        shared = (recipes @ pantries.T).toarray()
+        return shared[inverse.reshape(ids.shape), np.arange(ids.shape[0])[:, None]]
+
+    def _rank(self, input_vector, similarity, top_k, rows=None, calorie_target=None):
+        """
+        The top_k recipes under the scorer, as (ids, scores, similarity). similarity holds one
+        query's scores over rows (every recipe when None), -inf for excluded ones. The hybrid
+        scorer re-ranks the scorer.pool recipes with the best similarity, in one vectorised
+        pass over those rows.
+        """
+        if not self.scorer.uses_pantry:
+            positions, best = select_top_k(similarity, top_k)
+            keep = np.isfinite(best[0])
+            ids = positions[0][keep] if rows is None else rows[positions[0][keep]]
+            return ids, best[0][keep], best[0][keep]
+
+        ids, scores, best = self._rank_many(input_vector, similarity[None], top_k, rows, calorie_target)
+        keep = np.isfinite(scores[0])
+        return ids[0][keep], scores[0][keep], best[0][keep]
+
+    def _rank_many(self, input_vectors, similarity, top_k, rows=None, calorie_target=None):
+        """
+        The hybrid re-rank for a block of queries at once: similarity is (n_queries, n_rows)
+        and the result is (ids, scores, similarity) arrays of shape (n_queries, top_k), with
+        -inf scores in slots no finite candidate filled.
+        """
+        # The pool is re-ranked anyway, so it is only partitioned out, not sorted; ascending
+        # positions make ties in the blend go to the lower recipe id
+        depth = min(max(self.scorer.pool, top_k), similarity.shape[1])
+        if depth < similarity.shape[1]:
+            positions = np.sort(np.argpartition(-similarity, depth - 1, axis=1)[:, :depth], axis=1)
+        else:
+            positions = np.broadcast_to(np.arange(depth), similarity.shape)
+        best = np.take_along_axis(similarity, positions, axis=1)
+        ids = positions if rows is None else rows[positions]
+
+        scores = self.scorer.blend(
+            best, self._pantry_hits_many(input_vectors, ids), self.term_counts[ids], self.calories[ids], calorie_target
+        )
+        scores[~np.isfinite(best)] = -np.inf
+        order, top = select_top_k(scores, top_k)
+        return np.take_along_axis(ids, order, axis=1), top, np.take_along_axis(best, order, axis=1)
 
-        self.df = self.df.reset_index(drop=True).copy()
+    @staticmethod
+    def canonical_ingredients(ingredients):
+        """
+        The query as a sorted tuple of distinct cleaned ingredients; the query text and the
+        result cache key are both built from it, so equivalent pantries share one entry.
+        """
+        cleaned = {Preprocessor.clean_text(ingredient) for ingredient in ingredients}
+        cleaned.discard("")
+        # Input that cleans away entirely is still scored, on its raw lowercased words
+        return tuple(sorted(cleaned or {str(ingredient).strip().lower() for ingredient in ingredients}))
 
-        self.similarity_matrix = cosine_similarity(self.tfidf_matrix)
+    def _query_text(self, ingredients):
+        return " ".join(self.canonical_ingredients(ingredients))
+
+    def _filter_key(self, ingredients):
+        return tuple(sorted({" ".join(clause) for clause in self._clauses(ingredients)}))
+
+    @staticmethod
+    def _clauses(ingredients):
+        # Filter terms are cleaned like ingredients_cleaned; a multi-word term must match every word
+        return [Preprocessor.clean_text(ingredient).split() for ingredient in ingredients or ()]
+
+    def _candidates(self, include=None, exclude=None, any_of=None):
+        """
+        Sorted ids of the recipes satisfying the ingredient filters, resolved on the posting
+        lists before any scoring; None when no filter is given.
+        """
+        include, exclude, any_of = self._clauses(include), self._clauses(exclude), self._clauses(any_of)
+        rows = self.postings.candidates(include, exclude, any_of)
+        if rows is None or self.delta_postings is None:
+            return rows
+        added = self.delta_postings.candidates(include, exclude, any_of)
+        return np.concatenate([rows, added + self.base_rows])
+
+    def _ann_candidates(self, input_vector, candidates):
+        """Narrows candidates (None meaning every recipe) to those found by the impact index."""
+        rows = self.ann_index.candidates(input_vector, self.depth)
+        # Recipes added since the build are not in any list, so they are always scored
+        rows = np.concatenate([rows, np.arange(self.base_rows, self.n_recipes)])
+        return rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+
+    def _excluded(self, max_calories):
+        excluded = self.deleted
+        if max_calories is not None:
+            # Written as a negation so recipes with unknown calories are excluded too
+            over_limit = ~(self.calories <= max_calories)
+            excluded = over_limit if excluded is None else excluded | over_limit
+        return excluded
+
+    def _format_results(self, rows, scores, similarity=None) -> pd.DataFrame:
+        # Only the returned rows are ever decoded into a DataFrame; score is what the rows
+        # are ranked by, which is the similarity itself unless a blend was applied
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [col for col in self.result_columns if col not in SCORE_COLUMNS]
+        if self.delta_recipes is None:
+            recommendations = self.recipes.take(rows, columns)
+        else:
+            base, added = rows[rows < self.base_rows], rows[rows >= self.base_rows]
+            added_recipes = self.delta_recipes.take(added - self.base_rows, columns)
+            added_recipes.index = pd.Index(added)
+            recommendations = pd.concat([self.recipes.take(base, columns), added_recipes]).loc[rows]
+
+        recommendations["similarity"] = scores if similarity is None else similarity
+        recommendations["score"] = scores
+        return recommendations[self.result_columns]
+
+    def _filter_candidates(self, candidates, excluded):
+        if excluded is not None:
+            candidates = candidates[~excluded[candidates]]
+        return candidates
 
     def recommend_by_ingredients(
         self,
         input_ingredients,
         max_calories=None,
-        top_k=5
+        top_k=5,
+        include=None,
+        exclude=None,
+        any_of=None,
+        target_calories=None
     )-> pd.DataFrame:
+        """
+        include, exclude and any_of are ingredient filters: recipes must contain every include
+        ingredient, at least one any_of ingredient and no exclude ingredient. max_calories is
+        a hard limit; with the hybrid scorer, target_calories ranks recipes closer to it higher.
+
+        Results are cached per canonical query (see canonical_ingredients) and settings, for
+        QUERY_CACHE_TTL seconds or until refresh() picks up a new index version.
+        """
         if not input_ingredients:
             raise ValueError("Input ingredients cannot be empty.")
-        
-        input_text = " ".join(input_ingredients)
-        input_vector = self.vectorizer.transform([input_text])
 
-        similarity_scores = cosine_similarity(input_vector, self.tfidf_matrix).flatten()
-        
-        filtered_df = self.df.copy()
-        filtered_df["similarity"] = similarity_scores
+        metrics.count("recommend.requests")
+        key = (
+            self.canonical_ingredients(input_ingredients), max_calories, top_k,
+            self._filter_key(include), self._filter_key(exclude), self._filter_key(any_of), target_calories,
+        )
+        stamp = (self.index_id, self.index_version)
+        cached = self.query_cache.get(key, stamp)
+        if cached is not None:
+            metrics.count("recommend.cache_hits")
+            return cached.copy()
 
-        if max_calories is not None:
-            filtered_df = filtered_df[filtered_df["calories"] <= max_calories]
+        results = self._recommend(key[0], max_calories, top_k, include, exclude, any_of, target_calories)
+        self.query_cache.put(key, results.copy(), stamp)
+        return results
+
+    def _recommend(self, canonical, max_calories, top_k, include, exclude, any_of, target_calories=None) -> pd.DataFrame:
+        with metrics.timer("recommend.total"):
+            with metrics.timer("recommend.transform"):
+                input_vector = self.vectorizer.transform([" ".join(canonical)])
+
+            with metrics.timer("recommend.filter"):
+                excluded = self._excluded(max_calories)
+                candidates = self._candidates(include, exclude, any_of)
+                if self.backend == "ann":
+                    candidates = self._ann_candidates(input_vector, candidates)
+                if candidates is not None:
+                    # Only the recipes passing the filters are scored
+                    candidates = self._filter_candidates(candidates, excluded)
+
+            if candidates is not None:
+                metrics.count("recommend.rows_scored", len(candidates))
+                with metrics.timer("recommend.score"):
+                    similarity_scores = self._score(input_vector, candidates)
+                    rows, scores, similarity = self._rank(input_vector, similarity_scores, top_k, candidates, target_calories)
+                with metrics.timer("recommend.format"):
+                    return self._format_results(rows, scores, similarity)
+
+            metrics.count("recommend.rows_scored", self.n_recipes)
+            with metrics.timer("recommend.score"):
+                similarity_scores = self._score(input_vector)
+                if excluded is not None:
+                    similarity_scores[excluded] = -np.inf
+                rows, scores, similarity = self._rank(input_vector, similarity_scores, top_k, calorie_target=target_calories)
+
+            with metrics.timer("recommend.format"):
+                return self._format_results(rows, scores, similarity)
+
+    def recommend_batch(
+        self,
+        ingredient_lists,
+        max_calories=None,
+        top_k=5,
+        chunk_size=BATCH_CHUNK_SIZE,
+        as_frames=False,
+        include=None,
+        exclude=None,
+        any_of=None,
+        target_calories=None
+    ):
+        """
+        Recommends recipes for many ingredient lists at once; the ingredient filters and
+        calorie target are shared by every query.
+
+        Returns (indices, scores) arrays of shape (n_queries, top_k), best first, where scores
+        are those the scorer ranks by. Slots
+        left empty by the calorie filter hold -1 and NaN. With as_frames=True a list of
+        DataFrames shaped like recommend_by_ingredients results is returned instead, with the
+        cosine similarity and the scorer's score in their own columns.
+        Peak scoring memory is chunk_size x n_recipes floats.
+        """
+        if not ingredient_lists or not all(ingredient_lists):
+            raise ValueError("Input ingredients cannot be empty.")
+
+        metrics.count("recommend_batch.requests")
+        metrics.count("recommend_batch.queries", len(ingredient_lists))
+        with metrics.timer("recommend_batch.total"):
+            with metrics.timer("recommend_batch.transform"):
+                input_vectors = self.vectorizer.transform([self._query_text(ingredients) for ingredients in ingredient_lists])
+            with metrics.timer("recommend_batch.filter"):
+                excluded = self._excluded(max_calories)
+                candidates = self._candidates(include, exclude, any_of)
+                if candidates is not None:
+                    candidates = self._filter_candidates(candidates, excluded)
+                    excluded = None
+
+            n_queries = input_vectors.shape[0]
+            k = min(top_k, self.n_recipes)
+
+            indices = np.full((n_queries, k), -1, dtype=np.int32)
+            scores = np.full((n_queries, k), np.nan, dtype=np.float32)
+            similarities = np.full((n_queries, k), np.nan, dtype=np.float32)
+
+            if self.backend == "ann":
+                # Every query reads its own postings, so queries are scored one at a time
+                for i in range(n_queries):
+                    query_candidates = self._filter_candidates(self._ann_candidates(input_vectors[i], candidates), excluded)
+                    similarity = self._score(input_vectors[i], query_candidates)
+                    rows, row_scores, row_similarity = self._rank(input_vectors[i], similarity, k, query_candidates, target_calories)
+                    indices[i, :len(rows)] = rows
+                    scores[i, :len(rows)] = row_scores
+                    similarities[i, :len(rows)] = row_similarity
+                return self.batch_to_frames(indices, scores, similarities) if as_frames else (indices, scores)
+
+            for start in range(0, n_queries, chunk_size):
+                stop = min(start + chunk_size, n_queries)
+                with metrics.timer("recommend_batch.score_chunk"):
+                    chunk_scores = self._score_many(input_vectors[start:stop], candidates)
+                    if excluded is not None:
+                        chunk_scores[:, excluded] = -np.inf
+                if self.scorer.uses_pantry:
+                    rows, row_scores, row_similarity = self._rank_many(
+                        input_vectors[start:stop], chunk_scores, k, candidates, target_calories
+                    )
+                else:
+                    rows, row_scores = select_top_k(chunk_scores, k)
+                    if candidates is not None:
+                        rows = candidates[rows]
+                    row_similarity = row_scores
+                # Fewer candidates than top_k leave the trailing slots empty
+                width = rows.shape[1]
+                valid = np.isfinite(row_scores)
+                indices[start:stop, :width][valid] = rows[valid]
+                scores[start:stop, :width][valid] = row_scores[valid]
+                similarities[start:stop, :width][valid] = row_similarity[valid]
+
+            if as_frames:
+                return self.batch_to_frames(indices, scores, similarities)
+            return indices, scores
+
+    def cache_stats(self):
+        """Hit/miss counters of the query-result cache."""
+        return self.query_cache.stats()
+
+    def batch_to_frames(self, indices, scores, similarities=None):
+        """
+        Converts recommend_batch arrays into one result DataFrame per query; similarities
+        default to the scores, which they are under the cosine scorer.
+        """
+        if similarities is None:
+            similarities = scores
+        frames = []
+        for rows, row_scores, row_similarity in zip(indices, scores, similarities):
+            keep = rows >= 0
+            frames.append(self._format_results(rows[keep], row_scores[keep], row_similarity[keep]))
+        return frames
+
+    def similar_recipes(self, recipe_id, top_k=5) -> pd.DataFrame:
+        """Returns the recipes most similar to recipe_id, read from the precomputed neighbor index."""
+        if not 0 <= recipe_id < self.n_recipes or (self.deleted is not None and self.deleted[recipe_id]):
+            raise ValueError(f"Unknown recipe id: {recipe_id}")
+
+        if self.neighbor_index is None or recipe_id >= self.neighbor_index.shape[0]:
+            # Recipes added since the last full build, and every recipe of an index built
+            # without neighbors, are scored on demand
+            return self._exact_neighbors(recipe_id, top_k)
+
+        start, stop = self.neighbor_index.indptr[recipe_id:recipe_id + 2]
+        neighbor_ids = self.neighbor_index.indices[start:stop]
+        neighbor_scores = self.neighbor_index.data[start:stop]
+        if self.deleted is not None:
+            keep = ~self.deleted[neighbor_ids]
+            neighbor_ids, neighbor_scores = neighbor_ids[keep], neighbor_scores[keep]
+        return self._format_results(neighbor_ids[:top_k], neighbor_scores[:top_k])
+
+    def _exact_neighbors(self, recipe_id, top_k):
+        if recipe_id < self.base_rows:
+            scores = self._score(self.tfidf_matrix[recipe_id])
+        else:
+            scores = self._score(self.delta_matrix[recipe_id - self.base_rows])
+        excluded = self._excluded(None)
+        if excluded is not None:
+            scores[excluded] = -np.inf
+        scores[recipe_id] = -np.inf
+
+        rows, row_scores = select_top_k(scores, top_k)
+        keep = row_scores[0] > 0
+        return self._format_results(rows[0][keep], row_scores[0][keep])
 
-        recommendations = (
-            filtered_df.sort_values(by="similarity", ascending=False)
-                  .head(top_k)
-                  .copy()
-        )
-        cols = ["image", "title", "calories", "serves", "total time", "similarity", "ingredients"]
-        available_cols = [col for col in cols if col in recommendations.columns]
-        return recommendations[available_cols]
-    
     def get_most_used_ingredients(self, top_n: int = 20) -> pd.DataFrame:
-        all_ingredients = " ".join(self.df["ingredients_cleaned"].astype(str)).split()
+        if self.delta_recipes is None and self.deleted is None:
+            return pd.DataFrame(self.ingredient_stats.top(top_n), columns=["ingredient_cleaned", "count"])
+
+        # The stored counts describe the base build; recount while updates are pending
+        documents = self.recipes.column("ingredients_cleaned")
+        if self.delta_recipes is not None:
+            documents += self.delta_recipes.column("ingredients_cleaned")
+        if self.deleted is not None:
+            documents = [doc for doc, deleted in zip(documents, self.deleted) if not deleted]
+        all_ingredients = " ".join(documents).split()
         counter = Counter(all_ingredients)
         return pd.DataFrame(counter.most_common(top_n), columns=["ingredient_cleaned", "count"])
@@ -0,0 +1,102 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCORERS = ("cosine", "hybrid")
+SCORER = os.getenv("SCORER", "cosine")
+SCORE_SIMILARITY = float(os.getenv("SCORE_SIMILARITY", 1.0))
+SCORE_COVERAGE = float(os.getenv("SCORE_COVERAGE", 0.5))
+SCORE_MISSING = float(os.getenv("SCORE_MISSING", 0.005))
+SCORE_CALORIES = float(os.getenv("SCORE_CALORIES", 0.3))
+CALORIE_SCALE = float(os.getenv("CALORIE_SCALE", 500))
+# Recipes with the best similarity that the blend re-ranks
+HYBRID_POOL = int(os.getenv("HYBRID_POOL", 200))
+
+TERM_COUNTS_FILE = "term_counts.npy"
+COUNT_CHUNK = 100_000
+
+
+def unigram_columns(vectorizer):
+    """Boolean mask of the vectorizer columns holding single words rather than bigrams."""
+    terms = getattr(vectorizer.vocabulary_, "terms", None)
+    if terms is not None:
+        return np.char.find(terms, b" ") < 0
+    return np.array([" " not in term for term in vectorizer.get_feature_names_out()])
+
+
+def count_terms(tfidf_matrix, unigrams):
+    """Distinct single-word terms of every row, read off the matrix in chunks of rows."""
+    counts = np.empty(tfidf_matrix.shape[0], dtype=np.int32)
+    for start in range(0, tfidf_matrix.shape[0], COUNT_CHUNK):
+        chunk = tfidf_matrix[start:start + COUNT_CHUNK]
+        single = np.concatenate([[0], np.cumsum(unigrams[chunk.indices], dtype=np.int64)])
+        counts[start:start + chunk.shape[0]] = single[chunk.indptr[1:]] - single[chunk.indptr[:-1]]
+    return counts
+
+
+def save_term_counts(path, counts):
+    np.save(path, counts)
+
+
+def load_term_counts(path, mmap=True):
+    """Opens counts written by save_term_counts, or returns None for indexes built without them."""
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+class CosineScorer:
+    """Ranks by similarity alone."""
+
+    uses_pantry = False
+
+    def blend(self, similarity, hits, term_counts, calories, calorie_target=None):
+        return similarity
+
+
+class HybridScorer:
+    """
+    Ranks by a weighted blend of how close a recipe is to the pantry and how much of it the
+    pantry covers:
+
+        similarity * cosine + coverage * hits / terms - missing * (terms - hits)
+        - calories * min(|calories - target| / calorie_scale, 1)
+
+    where terms is the recipe's distinct single-word ingredient terms and hits those among
+    the pantry's. The calorie term only applies when a target is given; recipes with unknown
+    calories get the full penalty. The blend re-ranks the pool best recipes by similarity.
+    """
+
+    uses_pantry = True
+
+    def __init__(self, similarity=SCORE_SIMILARITY, coverage=SCORE_COVERAGE, missing=SCORE_MISSING,
+                 calories=SCORE_CALORIES, calorie_scale=CALORIE_SCALE, pool=HYBRID_POOL):
+        if calorie_scale <= 0 or pool <= 0:
+            raise ValueError("calorie_scale and pool must be positive.")
+        self.similarity = similarity
+        self.coverage = coverage
+        self.missing = missing
+        self.calories = calories
+        self.calorie_scale = calorie_scale
+        self.pool = pool
+
+    def blend(self, similarity, hits, term_counts, calories, calorie_target=None):
+        """Blended scores of the candidate rows; every argument is an array over those rows."""
+        term_counts = np.maximum(term_counts, hits)
+        scores = (
+            self.similarity * similarity
+            + self.coverage * hits / np.maximum(term_counts, 1)
+            - self.missing * (term_counts - hits)
+        )
+        if calorie_target is not None and self.calories:
+            distance = np.abs(calories - calorie_target) / self.calorie_scale
+            scores -= self.calories * np.minimum(np.nan_to_num(distance, nan=1.0), 1.0)
+        return scores
+
+
+def make_scorer(name=SCORER):
+    if name not in SCORERS:
+        raise ValueError(f"Unknown scorer {name!r}; expected one of {SCORERS}.")
+    return HybridScorer() if name == "hybrid" else CosineScorer()
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from dotenv import load_dotenv
+
+from src.scraping.scrap_recipes import (
+    HEADERS,
+    RECIPE_LIST_URL,
+    parse_number_of_pages,
+    parse_recipe_links,
+    parse_recipe,
+    parse_nutrition,
+)
+from src.scraping.recipe_sink import RecipeSink, publish
+
+load_dotenv()
+
+SCRAPER_CONCURRENCY = int(os.getenv("SCRAPER_CONCURRENCY", 8))
+SCRAPER_RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", 4.0))
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", 3))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", 20))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HostLimiter:
+    """Caps in-flight requests and spaces request starts to at most rate_limit per second."""
+
+    def __init__(self, concurrency, rate_limit):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate_limit if rate_limit else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
+
+
+class AsyncRecipeScraper:
+    """
+    asyncio crawler over one pooled aiohttp session. Each host gets its own concurrency and
+    rate limit; failed requests are retried with exponential backoff. Every recipe page is
+    followed by its nutrition iframe in the same task, so the two kinds of fetches overlap
+    across recipes instead of running in lockstep.
+    """
+
+    def __init__(
+        self,
+        list_url=RECIPE_LIST_URL,
+        headers=HEADERS,
+        concurrency=SCRAPER_CONCURRENCY,
+        rate_limit=SCRAPER_RATE_LIMIT,
+        retries=SCRAPER_RETRIES,
+        timeout=SCRAPER_TIMEOUT,
+        backoff=0.5,
+    ):
+        self.list_url = list_url.rstrip("/")
+        self.headers = headers
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.limiters = {}
+        self.session = None
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.concurrency, self.rate_limit)
+        return self.limiters[host]
+
+    async def fetch(self, url):
+        """Returns the response body, or None once the retries are exhausted."""
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._limiter(url):
+                    async with self.session.get(url) as response:
+                        if response.status == 200:
+                            return await response.read()
+                        if response.status not in RETRY_STATUSES:
+                            print(f"Failed to fetch {url}: HTTP {response.status}")
+                            return None
+                        error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+        print(f"Giving up on {url} after {self.retries + 1} attempts: {error}")
+        return None
+
+    async def get_recipe_links(self):
+        first_page = await self.fetch(self.list_url)
+        if first_page is None:
+            return []
+        total_pages = parse_number_of_pages(first_page)
+
+        pages = await asyncio.gather(*(
+            self.fetch(f"{self.list_url}/page/{page}") for page in range(1, total_pages + 1)
+        ))
+        recipe_links = []
+        for page, html in enumerate(pages, start=1):
+            if html is None:
+                print(f"Failed to fetch page {page}")
+                continue
+            recipe_links.extend(parse_recipe_links(html))
+        return recipe_links
+
+    async def scrape_recipe(self, recipe_url):
+        html = await self.fetch(recipe_url)
+        if html is None:
+            return None
+        try:
+            recipe, nutrition_facts_link = parse_recipe(html)
+        except Exception as e:
+            print(f"Exception {e} occurred while scraping {recipe_url}")
+            return None
+
+        serves, calories_per_serving = 0, 0
+        nutrition_html = await self.fetch(nutrition_facts_link)
+        if nutrition_html is not None:
+            try:
+                serves, calories_per_serving = parse_nutrition(nutrition_html)
+            except Exception as e:
+                print(f"Exception {e} occurred while fetching nutrition facts from {nutrition_facts_link}")
+        recipe['calories'] = calories_per_serving
+        recipe['serves'] = serves
+        return recipe
+
+    async def crawl(self, recipe_urls=None, on_recipe=None, skip_urls=()):
+        """
+        Scrapes every listed recipe (or recipe_urls) not in skip_urls; on_recipe(url, recipe)
+        runs as each one completes.
+        """
+        connector = aiohttp.TCPConnector(limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as session:
+            self.session = session
+            if recipe_urls is None:
+                recipe_urls = await self.get_recipe_links()
+            recipe_urls = [url for url in recipe_urls if url not in skip_urls]
+
+            async def scrape(url):
+                return url, await self.scrape_recipe(url)
+
+            recipes = []
+            for task in asyncio.as_completed([scrape(url) for url in recipe_urls]):
+                url, recipe = await task
+                print("Scraped:", url)
+                if recipe:
+                    recipes.append(recipe)
+                    if on_recipe:
+                        on_recipe(url, recipe)
+            self.session = None
+        return recipes
+
+
+def scrape_recipes_async(sink=None, **kwargs):
+    sink = sink or RecipeSink()
+    scraper = AsyncRecipeScraper(**kwargs)
+    with sink:
+        return asyncio.run(scraper.crawl(on_recipe=sink.add, skip_urls=sink.scraped_urls))
+
+
+if __name__ == "__main__":
+    scrape_recipes_async()
+    publish()
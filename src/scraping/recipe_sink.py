@@ -0,0 +1,154 @@
+import glob
+import json
+import os
+import threading
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCRAPE_DIR = os.getenv("SCRAPE_DIR", "data/raw/scraped")
+SCRAPE_BATCH_SIZE = int(os.getenv("SCRAPE_BATCH_SIZE", 50))
+# Rows of the raw CSV copied at once by export_csv
+SCRAPE_EXPORT_CHUNK_SIZE = int(os.getenv("SCRAPE_EXPORT_CHUNK_SIZE", 10000))
+
+RECIPE_COLUMNS = ['image', 'title', 'description', 'total time', 'ingredients', 'instructions', 'calories', 'serves']
+
+
+def recipe_keys(df):
+    """(title, image) pairs identifying the recipes of df; the raw CSV has no URL column."""
+    return zip(df['title'].fillna(''), df['image'].fillna(''))
+
+
+class RecipeSink:
+    """
+    Buffers scraped recipes and flushes them in bulk as JSON-lines segments.
+
+    Every flush writes one new part-NNNNN.jsonl file through a .tmp file and os.replace, so a
+    crawl that dies mid-flush never leaves a torn segment behind. Each record keeps the URL it
+    was scraped from; the URLs of all committed segments are read back on startup, so an
+    interrupted crawl can skip what it already has.
+    """
+
+    def __init__(self, directory=SCRAPE_DIR, batch_size=SCRAPE_BATCH_SIZE):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.buffer = []
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for tmp_path in glob.glob(os.path.join(directory, "*.tmp")):
+            os.remove(tmp_path)
+
+        self.n_segments = len(self.segments(directory))
+        self.scraped_urls = {record["url"] for record in self.iter_records(directory)}
+
+    @staticmethod
+    def segments(directory=SCRAPE_DIR):
+        return sorted(glob.glob(os.path.join(directory, "part-*.jsonl")))
+
+    @classmethod
+    def iter_records(cls, directory=SCRAPE_DIR):
+        for path in cls.segments(directory):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def pending(self, urls):
+        """Returns the URLs that are not stored yet, in their original order."""
+        return [url for url in urls if url not in self.scraped_urls]
+
+    def add(self, url, recipe):
+        with self.lock:
+            self.buffer.append({"url": url, **recipe})
+            self.scraped_urls.add(url)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        path = os.path.join(self.directory, f"part-{self.n_segments:05d}.jsonl")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        self.n_segments += 1
+        self.buffer = []
+
+    @classmethod
+    def read_frame(cls, directory=SCRAPE_DIR):
+        """Loads every stored recipe; a URL scraped more than once keeps its latest record."""
+        df = pd.DataFrame(list(cls.iter_records(directory)), columns=["url"] + RECIPE_COLUMNS)
+        return df.drop_duplicates("url", keep="last").reset_index(drop=True)
+
+    @classmethod
+    def new_recipes(cls, known, directory=SCRAPE_DIR):
+        """Stored recipes whose (title, image) pair is not in known, in the raw CSV layout."""
+        df = cls.read_frame(directory)[RECIPE_COLUMNS]
+        return df[[key not in known for key in recipe_keys(df)]].reset_index(drop=True)
+
+    @classmethod
+    def export_csv(cls, path, directory=SCRAPE_DIR, chunk_size=SCRAPE_EXPORT_CHUNK_SIZE):
+        """
+        Adds the stored recipes missing from the raw CSV at path to its end. The existing rows
+        are streamed unchanged into a .tmp file first, so their order, and with it the recipe
+        ids of an index built from them, is kept. Returns the number of recipes added.
+        """
+        tmp_path = f"{path}.tmp"
+        known = set()
+        columns = RECIPE_COLUMNS
+        if os.path.exists(path):
+            columns = pd.read_csv(path, nrows=0).columns
+            for i, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size)):
+                chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+                known.update(recipe_keys(chunk))
+        if not known:
+            pd.DataFrame(columns=columns).to_csv(tmp_path, index=False)
+
+        df = cls.new_recipes(known, directory).reindex(columns=columns)
+        df.to_csv(tmp_path, mode='a', header=False, index=False)
+        os.replace(tmp_path, path)
+        print(f"Added {len(df)} recipes to {path}")
+        return len(df)
+
+
+def publish(directory=SCRAPE_DIR):
+    """
+    Hands the newly scraped recipes to the catalog. Before the first build they are added to
+    the raw CSV; once an index exists they go through RecipeVectorizer.update_index as a
+    delta, so the raw CSV keeps matching the index until the next full build folds them in.
+    """
+    from src.index_store import index_exists
+    from src.recipe_vectorizer import RecipeVectorizer
+
+    trainer = RecipeVectorizer()
+    if not (index_exists(trainer.index_dir) or os.path.exists(trainer.vectorizer_path)):
+        return RecipeSink.export_csv(trainer.raw_path, directory)
+
+    known = set()
+    for chunk in pd.read_csv(trainer.raw_path, usecols=['title', 'image'], chunksize=trainer.chunk_size):
+        known.update(recipe_keys(chunk))
+    delta = trainer.load_delta()
+    if delta is not None and len(delta["recipes"]):
+        known.update(recipe_keys(delta["recipes"]))
+
+    df = RecipeSink.new_recipes(known, directory)
+    if not len(df):
+        print("No new recipes to add.")
+        return 0
+    trainer.update_index(df)
+    return len(df)
@@ -0,0 +1,89 @@
+import json
+import os
+import numpy as np
+from scipy.sparse import csr_matrix
+
+META_FILE = "meta.json"
+COPY_BLOCK = 1 << 22
+
+
+def _index_dtype(max_value):
+    return np.int32 if max_value < np.iinfo(np.int32).max else np.int64
+
+
+def bin_to_npy(bin_path, npy_path, source_dtype, target_dtype):
+    # Copies block by block so finalising never holds a whole array in memory
+    source = np.memmap(bin_path, dtype=source_dtype, mode="r") if os.path.getsize(bin_path) else np.empty(0, source_dtype)
+    target = np.lib.format.open_memmap(npy_path, mode="w+", dtype=target_dtype, shape=source.shape)
+    for start in range(0, len(source), COPY_BLOCK):
+        target[start:start + COPY_BLOCK] = source[start:start + COPY_BLOCK]
+    target.flush()
+    del source, target
+    os.remove(bin_path)
+
+
+class SparseMatrixWriter:
+    """Appends blocks of CSR rows to a directory of .npy arrays without keeping them in memory."""
+
+    def __init__(self, directory, n_cols, dtype=np.float32):
+        self.directory = directory
+        self.n_cols = n_cols
+        self.dtype = np.dtype(dtype)
+        self.n_rows = 0
+        self.nnz = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._files = {
+            name: open(os.path.join(directory, f"{name}.bin"), "wb")
+            for name in ("data", "indices", "indptr")
+        }
+        np.zeros(1, dtype=np.int64).tofile(self._files["indptr"])
+
+    def append(self, block):
+        block = csr_matrix(block)
+        if block.shape[1] != self.n_cols:
+            raise ValueError(f"Expected {self.n_cols} columns, got {block.shape[1]}")
+
+        block.data.astype(self.dtype).tofile(self._files["data"])
+        block.indices.astype(np.int64).tofile(self._files["indices"])
+        (block.indptr[1:].astype(np.int64) + self.nnz).tofile(self._files["indptr"])
+        self.n_rows += block.shape[0]
+        self.nnz += block.nnz
+
+    def close(self):
+        """Finalises the arrays; indices use int32 whenever the matrix fits, so scipy never recasts them."""
+        for f in self._files.values():
+            f.close()
+
+        index_dtype = _index_dtype(max(self.nnz, self.n_cols))
+        for name, source_dtype, target_dtype in (
+            ("data", self.dtype, self.dtype),
+            ("indices", np.int64, index_dtype),
+            ("indptr", np.int64, index_dtype),
+        ):
+            bin_to_npy(
+                os.path.join(self.directory, f"{name}.bin"),
+                os.path.join(self.directory, f"{name}.npy"),
+                source_dtype,
+                target_dtype,
+            )
+
+        with open(os.path.join(self.directory, META_FILE), "w") as f:
+            json.dump({"shape": [self.n_rows, self.n_cols], "nnz": self.nnz}, f)
+        return self.n_rows, self.n_cols
+
+
+def save_sparse_matrix(directory, matrix, dtype=np.float32):
+    writer = SparseMatrixWriter(directory, matrix.shape[1], dtype=dtype)
+    writer.append(matrix)
+    writer.close()
+
+
+def load_sparse_matrix(directory, mmap=True):
+    """Opens a matrix written by SparseMatrixWriter; with mmap=True the arrays stay on disk."""
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+
+    mmap_mode = "r" if mmap else None
+    arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ("data", "indices", "indptr")]
+    return csr_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
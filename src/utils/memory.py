@@ -0,0 +1,52 @@
+"""
+Resident memory of the current process, read from /proc/self/status (Linux only).
+
+PeakTracker measures how far the peak RSS of a block rises above the RSS at its start, by
+resetting the kernel's high-water mark on entry. Unlike tracemalloc it does not slow the
+measured code down, and it also sees memory allocated by native libraries.
+"""
+
+
+def memory_status():
+    """Current and peak resident set size in MiB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return None
+    return int(fields["VmRSS"].split()[0]) / 1024, int(fields["VmHWM"].split()[0]) / 1024
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS (Linux 4.0+)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class PeakTracker:
+    """Peak RSS growth of nested blocks; an outer block's peak includes its inner ones."""
+
+    def __init__(self):
+        self._stack = []
+
+    def enter(self):
+        status = memory_status()
+        if status and self._stack:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], status[1])
+        reset_peak_rss()
+        status = memory_status()
+        self._stack.append({"rss": status[0] if status else 0.0, "peak": 0.0})
+
+    def exit(self):
+        """Closes the innermost block; returns its peak growth in MiB, or None without /proc."""
+        frame = self._stack.pop()
+        status = memory_status()
+        if not status:
+            return None
+        peak = max(frame["peak"], status[1])
+        if self._stack:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+        return peak - frame["rss"]
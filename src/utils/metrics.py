@@ -0,0 +1,307 @@
+"""
+In-process timers, counters and latency histograms for the serving paths.
+
+Instrumentation is off unless METRICS_SINK names a sink:
+
+    log         one line per metric printed every METRICS_FLUSH_INTERVAL seconds and at exit
+    json        the same snapshot written atomically to METRICS_PATH
+    prometheus  text exposition format served on http://127.0.0.1:METRICS_PORT/metrics
+
+When it is off, timer() hands back one shared no-op context manager, and count(), observe()
+and functions decorated with timed() return at once. Every call checks whether
+instrumentation is on, so configure() takes effect at any time, also for functions
+decorated at import. Any object with an export(snapshot) method can be installed with
+configure().
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_SINK = os.getenv("METRICS_SINK", "")
+METRICS_PATH = os.getenv("METRICS_PATH", "data/metrics.json")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 60))
+
+# Upper bounds of the latency buckets in seconds, 100 us to 10 s
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are read off the bucket bounds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (the max for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Named counters and histograms shared by every thread of the process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "time": time.time(),
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class Timer:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class LogSink:
+    def export(self, snapshot):
+        for name, value in sorted(snapshot["counters"].items()):
+            print(f"[metrics] {name} = {value}")
+        for name, h in sorted(snapshot["histograms"].items()):
+            print(
+                f"[metrics] {name} count={h['count']} mean={1000 * h['sum'] / max(h['count'], 1):.2f}ms "
+                f"p50<={1000 * h['p50']:.2f}ms p90<={1000 * h['p90']:.2f}ms p99<={1000 * h['p99']:.2f}ms "
+                f"max={1000 * h['max']:.2f}ms"
+            )
+
+
+class JsonFileSink:
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+
+    def export(self, snapshot):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def prometheus_name(name):
+    return "recipe_" + name.replace(".", "_").replace("-", "_")
+
+
+def render_prometheus(snapshot):
+    """Prometheus text exposition format: counters as *_total, histograms in seconds."""
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        metric = prometheus_name(name) + "_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    for name, h in sorted(snapshot["histograms"].items()):
+        metric = prometheus_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in h["buckets"].items():
+            cumulative += count
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+        lines += [f"{metric}_sum {h['sum']}", f"{metric}_count {h['count']}"]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusSink:
+    """Serves the live registry on a local port; scraped on demand, so export() is a no-op."""
+
+    def __init__(self, port=METRICS_PORT, host="127.0.0.1"):
+        self.port = port
+        self.host = host
+        self.server = None
+
+    def start(self, registry):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus(registry.snapshot()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            # Another worker of the same app already serves this port
+            print(f"Metrics endpoint not started on port {self.port}: {e}")
+            return
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def export(self, snapshot):
+        pass
+
+
+SINKS = {"log": LogSink, "json": JsonFileSink, "prometheus": PrometheusSink}
+
+_registry = None
+_sink = None
+_flushing = False
+
+
+def configure(sink):
+    """Turns instrumentation on with a sink name from SINKS or a sink object; None turns it off."""
+    global _registry, _sink
+    if sink is None or sink == "":
+        _registry, _sink = None, None
+        return
+    if isinstance(sink, str):
+        if sink not in SINKS:
+            raise ValueError(f"Unknown METRICS_SINK {sink!r}; expected one of {tuple(SINKS)}.")
+        sink = SINKS[sink]()
+    _registry = _registry or MetricsRegistry()
+    _sink = sink
+    if hasattr(sink, "start"):
+        sink.start(_registry)
+    else:
+        _start_flushing()
+
+
+def enabled():
+    return _registry is not None
+
+
+def timer(name):
+    """Context manager recording the wall time of its block into histogram name."""
+    if _registry is None:
+        return NULL_TIMER
+    return Timer(_registry, name)
+
+
+def timed(name):
+    """Decorator form of timer(); whether to record is decided on each call, not when decorating."""
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            registry = _registry
+            if registry is None:
+                return fn(*args, **kwargs)
+            with Timer(registry, name):
+                return fn(*args, **kwargs)
+        wrapper.__name__, wrapper.__doc__, wrapper.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    if _registry is not None:
+        _registry.count(name, value)
+
+
+def observe(name, seconds):
+    if _registry is not None:
+        _registry.observe(name, seconds)
+
+
+def snapshot():
+    return _registry.snapshot() if _registry is not None else None
+
+
+def flush():
+    """Hands the current snapshot to the sink."""
+    if _registry is not None:
+        _sink.export(_registry.snapshot())
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        flush()
+
+
+def _start_flushing():
+    """Starts the periodic and at-exit flushes, once per process, whenever a pushing sink is configured."""
+    global _flushing
+    if _flushing:
+        return
+    _flushing = True
+    threading.Thread(target=_flush_periodically, daemon=True).start()
+    atexit.register(flush)
+
+
+configure(METRICS_SINK)
@@ -1,19 +1,26 @@
+import os
 import re
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
-from nltk.stem import PorterStemmer
 import ast
 import string
+from functools import lru_cache
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from src.utils import metrics
 
-nltk.download('punkt_tab')
-nltk.download('stopwords')
-nltk.download('wordnet')
-stop_words = stopwords.words('english')
-lemmatizer = WordNetLemmatizer()
-stemmer = PorterStemmer()
+load_dotenv()
+
+# NLTK and its corpora are loaded on first use, never at import. NLTK_DATA_DIR is searched
+# first. The corpora are installed once with `python -m src.utils.preprocess --download`;
+# serving processes never download them unless NLTK_AUTO_DOWNLOAD=1
+NLTK_DATA_DIR = os.getenv("NLTK_DATA_DIR", "data/nltk_data")
+NLTK_AUTO_DOWNLOAD = os.getenv("NLTK_AUTO_DOWNLOAD", "0") == "1"
+SETUP_COMMAND = "python -m src.utils.preprocess --download"
+NLTK_RESOURCES = {
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+}
 
 COOKING_STOPWORDS = {
     "fresh","freshly", "chopped", "optional", "pinch", "taste", "white","green","note","see","like",
@@ -23,8 +30,81 @@ COOKING_STOPWORDS = {
     "one","cut","shredded","peeled","use","thinly",
 }
 
+# Upper bounds on the number of memoised ingredient lines and lemmas
+CLEAN_TEXT_CACHE_SIZE = 100_000
+LEMMA_CACHE_SIZE = 50_000
+
+NUMBER_PATTERN = re.compile(r'\d+(\s\d+)?([/-]\d+)?')
+UNIT_PATTERN = re.compile(r'(tbl?s?(p(s)?)?\.?|tablespoons?|tsps?|teaspoons?|cups?|oz|ounces?|lbs?|pounds?|grams?|ml|quarts?|pints?|gallon|-inch|package|pkg\.|packets?|tube|sprigs?|t\.|-ish)\b\.?')
+
+# word_tokenize's punctuation filter is a substring test against string.punctuation;
+# tokens reaching it have two or more characters, so these are the runs it rejects
+PUNCTUATION_RUNS = frozenset(
+    string.punctuation[start:stop]
+    for start in range(len(string.punctuation))
+    for stop in range(start + 2, len(string.punctuation) + 1)
+)
+
+def ensure_nltk_data(download=NLTK_AUTO_DOWNLOAD, data_dir=NLTK_DATA_DIR):
+    """Makes the NLTK corpora findable, downloading the missing ones into data_dir if allowed."""
+    import nltk
+
+    if data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    missing = []
+    for package, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(package)
+    if missing and not download:
+        raise LookupError(
+            f"NLTK data {missing} not found in {nltk.data.path}. Install it once with "
+            f"`{SETUP_COMMAND}`, or point NLTK_DATA_DIR at an existing copy."
+        )
+    failed = [package for package in missing if not nltk.download(package, download_dir=data_dir, quiet=True)]
+    if failed:
+        raise LookupError(f"Could not download NLTK data {failed} into {data_dir}; copy it there from a machine with network access.")
+
+@lru_cache(maxsize=None)
+def _nltk():
+    ensure_nltk_data()
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+    from nltk.tokenize import word_tokenize
+
+    return SimpleNamespace(
+        stop_words=frozenset(stopwords.words('english')) | COOKING_STOPWORDS,
+        lemmatizer=WordNetLemmatizer(),
+        word_tokenize=word_tokenize,
+    )
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def _lemmatize(word):
+    return _nltk().lemmatizer.lemmatize(word)
+
+@lru_cache(maxsize=CLEAN_TEXT_CACHE_SIZE)
+def _clean_line(text):
+    text = text.lower()
+    # Remove numbers/fractions
+    text = NUMBER_PATTERN.sub('', text)
+    text = UNIT_PATTERN.sub('', text)
+    text = text.strip()
+    
+    nlp = _nltk()
+    lemmatized_tokens = [_lemmatize(word) for word in nlp.word_tokenize(text)]
+
+    filtered_tokens = [word for word in lemmatized_tokens 
+                    if len(word) > 1
+                    and word not in nlp.stop_words
+                    and word not in PUNCTUATION_RUNS
+                    ]
+    
+    return ' '.join(filtered_tokens)
+
 class Preprocessor:
     @staticmethod
+    @metrics.timed("preprocess.clean_ingredients")
     def clean_ingredients(ingredients_input):
         if isinstance(ingredients_input, list):
             ingredients_list = ingredients_input
@@ -34,35 +114,59 @@ class Preprocessor:
             except (ValueError, SyntaxError):
                 return []
 
+        metrics.count("preprocess.lines", len(ingredients_list))
         cleaned_ingredients = []
         for ingredient in ingredients_list:
             cleaned = Preprocessor.clean_text(ingredient)
             if cleaned:
                 cleaned_ingredients.append(cleaned)
         
-        return list(set(cleaned_ingredients))
+        # Deduplicate in first-seen order so the output does not depend on string hashing,
+        # which differs between worker processes
+        return list(dict.fromkeys(cleaned_ingredients))
 
     @staticmethod
     def clean_text(text):  
         if pd.isna(text) or text is None or not isinstance(text, str):
             return "" # Return empty string instead of list for easier joining
 
-        text = text.lower()
-        # Remove numbers/fractions
-        text = re.sub(r'\d+(\s\d+)?([/-]\d+)?', '', text) 
-        
-        unit_pattern = r'(tbl?s?(p(s)?)?\.?|tablespoons?|tsps?|teaspoons?|cups?|oz|ounces?|lbs?|pounds?|grams?|ml|quarts?|pints?|gallon|-inch|package|pkg\.|packets?|tube|sprigs?|t\.|-ish)\b\.?'
-        text = re.sub(unit_pattern, '', text)
-        text = text.strip()
-        
-        tokens = word_tokenize(text)
-        lemmatized_tokens = [lemmatizer.lemmatize(word) for word in tokens]
-
-        filtered_tokens = [word for word in lemmatized_tokens 
-                        if word not in stop_words 
-                        and word not in COOKING_STOPWORDS
-                        and len(word) > 1 
-                        and word not in string.punctuation
-                        ]
-        
-        return ' '.join(filtered_tokens)
+        return _clean_line(text)
+
+    @staticmethod
+    def warm_up():
+        """Loads the lazily initialised NLTK resources; used once per worker process."""
+        nlp = _nltk()
+        nlp.word_tokenize("warm up")
+        nlp.lemmatizer.lemmatize("warm")
+
+    @staticmethod
+    def cache_stats():
+        """Returns hit/miss counters of the ingredient-line and lemma caches."""
+        stats = {}
+        for name, cached in (("clean_text", _clean_line), ("lemmatize", _lemmatize)):
+            info = cached.cache_info()
+            lookups = info.hits + info.misses
+            stats[name] = {
+                "hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+                "hit_rate": info.hits / lookups if lookups else 0.0,
+            }
+        return stats
+
+    @staticmethod
+    def clear_caches():
+        _clean_line.cache_clear()
+        _lemmatize.cache_clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Provisions the NLTK corpora used by Preprocessor.")
+    parser.add_argument("--download", action="store_true", help="download missing corpora into --data-dir")
+    parser.add_argument("--data-dir", default=NLTK_DATA_DIR)
+    args = parser.parse_args()
+    ensure_nltk_data(download=args.download, data_dir=args.data_dir)
+    print(f"NLTK data available ({', '.join(NLTK_RESOURCES)}), searched first in {args.data_dir}")
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Bounded LRU cache with a time-to-live, for query results.
+
+    Entries belong to a stamp (e.g. the index id and version they were computed on); a lookup
+    with a different stamp empties the cache first, so results never outlive their index.
+    max_size=0 disables it.
+    """
+
+    def __init__(self, max_size=1024, ttl=600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.stamp = None
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def _check_stamp(self, stamp):
+        if stamp != self.stamp:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.stamp = stamp
+
+    def get(self, key, stamp=None):
+        if not self.max_size:
+            return None
+        with self.lock:
+            self._check_stamp(stamp)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, stamp=None):
+        if not self.max_size:
+            return
+        with self.lock:
+            self._check_stamp(stamp)
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
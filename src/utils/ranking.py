@@ -0,0 +1,21 @@
+import numpy as np
+
+
+def select_top_k(scores, k):
+    """Returns the column indices and values of the k best scores in each row, best first."""
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+
+    # argpartition is O(N) per row; only the k survivors get sorted.
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidates.sort(axis=1)
+    values = np.take_along_axis(scores, candidates, axis=1)
+    # Stable sort on the ascending candidates breaks ties by lower row id
+    order = np.argsort(-values, axis=1, kind="stable")
+    return (
+        np.take_along_axis(candidates, order, axis=1),
+        np.take_along_axis(values, order, axis=1),
+    )